@@ -0,0 +1,474 @@
+"""
+Silence-aware segment planning for long narration tracks
+
+Intros, pauses and trailing silence cost as much diffusion as speech. This
+CPU stage finds them and renders only what needs the audio-driven model:
+
+1. detect_segments(): frame RMS energy (librosa) with a threshold relative to
+   the track's peak splits the audio into "speech" and "silence" spans;
+   short gaps stay inside speech so words are never cut
+2. plan_segments(): builds a compacted timeline that keeps every speech span
+   plus a short pause between them (so the mouth closes naturally) and drops
+   the rest. Pauses are lengthened where that makes a speech span start on a
+   clip boundary, so `num_clips` is planned for the compacted audio with as
+   few clips straddling an onset as possible
+3. compact_audio(): writes the compacted audio the GPU renders from, and
+   compact_video() cuts a pose video to the same windows so it stays in sync
+4. expand_video(): restores the original timeline on CPU, filling dropped
+   silence by looping the adjacent generated pause frames back and forth,
+   and muxes the original audio. Frames are streamed: only the first and
+   the most recent `loop_s` of frames are held in memory
+
+Planning is pure Python; librosa, soundfile, numpy and OpenCV are imported
+lazily by the functions that need them.
+"""
+
+import collections
+import io
+import math
+import subprocess
+import tempfile
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, List, Sequence, Tuple
+
+SPEECH = "speech"
+SILENCE = "silence"
+
+ANALYSIS_SR = 16000
+HOP_LENGTH = 512
+FRAME_LENGTH = 2048
+
+
+@dataclass
+class Segment:
+    """A span of the original audio, in seconds"""
+
+    start_s: float
+    end_s: float
+    kind: str
+
+    @property
+    def duration_s(self) -> float:
+        return self.end_s - self.start_s
+
+
+@dataclass
+class SegmentConfig:
+    # Frames quieter than this (dB relative to the loudest frame) are silent
+    threshold_db: float = -35.0
+    # Silences shorter than this stay inside the surrounding speech
+    min_silence_s: float = 0.8
+    # Speech blips shorter than this are treated as silence (clicks, breaths)
+    min_speech_s: float = 0.15
+    # Context kept around every speech span
+    pad_s: float = 0.2
+    # Pause kept between speech spans in the compacted audio
+    keep_pause_s: float = 0.4
+    # A pause may grow by up to this much to start speech on a clip boundary
+    boundary_slack_s: float = 1.0
+
+
+@dataclass
+class SegmentPlan:
+    """
+    Compacted timeline for a track
+
+    `windows` are (start_s, end_s) spans of the original audio that are
+    rendered, in order; the compacted audio is their concatenation.
+    """
+
+    duration_s: float
+    segments: List[Segment] = field(default_factory=list)
+    windows: List[Tuple[float, float]] = field(default_factory=list)
+    clip_s: float = 5.0
+
+    @property
+    def compact_s(self) -> float:
+        return sum(end - start for start, end in self.windows)
+
+    @property
+    def skipped_s(self) -> float:
+        return max(0.0, self.duration_s - self.compact_s)
+
+    @property
+    def num_clips(self) -> int:
+        return max(1, math.ceil(self.compact_s / self.clip_s - 1e-6))
+
+    @property
+    def speech_s(self) -> float:
+        return sum(s.duration_s for s in self.segments if s.kind == SPEECH)
+
+    def worthwhile(self, min_saving: float = 0.15) -> bool:
+        """True if compaction saves at least this share of the render"""
+        return self.duration_s > 0 and self.skipped_s / self.duration_s >= min_saving
+
+    def as_dict(self) -> dict:
+        return {
+            "duration_s": self.duration_s,
+            "segments": [asdict(s) for s in self.segments],
+            "windows": [list(w) for w in self.windows],
+            "clip_s": self.clip_s,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SegmentPlan":
+        return cls(
+            duration_s=data["duration_s"],
+            segments=[Segment(**s) for s in data.get("segments", [])],
+            windows=[tuple(w) for w in data.get("windows", [])],
+            clip_s=data.get("clip_s", 5.0),
+        )
+
+    def summary(self) -> str:
+        return (
+            f"{self.speech_s:.1f}s speech in {self.duration_s:.1f}s; rendering "
+            f"{self.compact_s:.1f}s ({self.num_clips} clips), skipping {self.skipped_s:.1f}s"
+        )
+
+
+def _runs(flags: Sequence[bool]) -> List[Tuple[bool, int, int]]:
+    """Collapse per-frame flags into (flag, start, end) runs"""
+    runs = []
+    for index, flag in enumerate(flags):
+        if runs and runs[-1][0] == flag:
+            runs[-1] = (flag, runs[-1][1], index + 1)
+        else:
+            runs.append((flag, index, index + 1))
+    return runs
+
+
+def segments_from_levels(
+    levels_db: Sequence[float],
+    frame_s: float,
+    duration_s: float,
+    config: SegmentConfig = None,
+) -> List[Segment]:
+    """
+    Classify per-frame loudness into speech and silence spans
+
+    Args:
+        levels_db: Frame energy in dB relative to the loudest frame (<= 0)
+        frame_s: Seconds between frames
+        duration_s: Length of the track
+        config: Thresholds and minimum span lengths
+
+    Returns:
+        Alternating, contiguous segments covering [0, duration_s]
+    """
+    config = config or SegmentConfig()
+    flags = [level > config.threshold_db for level in levels_db]
+
+    # Drop blips, then fill short gaps: both passes work on whole runs
+    min_speech = max(1, round(config.min_speech_s / frame_s))
+    min_silence = max(1, round(config.min_silence_s / frame_s))
+    for flag, start, end in _runs(flags):
+        if flag and end - start < min_speech:
+            flags[start:end] = [False] * (end - start)
+    for flag, start, end in _runs(flags):
+        if not flag and end - start < min_silence and 0 < start and end < len(flags):
+            flags[start:end] = [True] * (end - start)
+
+    speech = []
+    for flag, start, end in _runs(flags):
+        if flag:
+            start_s = max(0.0, start * frame_s - config.pad_s)
+            end_s = min(duration_s, end * frame_s + config.pad_s)
+            if speech and start_s <= speech[-1][1]:
+                speech[-1] = (speech[-1][0], end_s)
+            else:
+                speech.append((start_s, end_s))
+
+    segments = []
+    cursor = 0.0
+    for start_s, end_s in speech:
+        if start_s > cursor:
+            segments.append(Segment(cursor, start_s, SILENCE))
+        segments.append(Segment(start_s, end_s, SPEECH))
+        cursor = end_s
+    if cursor < duration_s:
+        segments.append(Segment(cursor, duration_s, SILENCE))
+    return segments
+
+
+def plan_segments(
+    segments: List[Segment],
+    duration_s: float,
+    clip_s: float = 5.0,
+    config: SegmentConfig = None,
+) -> SegmentPlan:
+    """
+    Choose which spans of the original audio to render
+
+    Leading and trailing silence is dropped; each inner silence keeps
+    `keep_pause_s`, lengthened (within the silence and `boundary_slack_s`)
+    when that lets the next speech span start exactly on a clip boundary of
+    the compacted timeline. A track without speech renders one short clip.
+    """
+    config = config or SegmentConfig()
+    plan = SegmentPlan(duration_s=duration_s, segments=list(segments), clip_s=clip_s)
+    speech = [s for s in segments if s.kind == SPEECH]
+    if not speech:
+        plan.windows = [(0.0, min(duration_s, clip_s))]
+        return plan
+
+    compact = 0.0
+    for index, segment in enumerate(speech):
+        if index > 0:
+            gap_start = speech[index - 1].end_s
+            gap = segment.start_s - gap_start
+            keep = min(gap, config.keep_pause_s)
+            # Distance from the end of the kept pause to the next clip boundary
+            to_boundary = (-(compact + keep)) % clip_s
+            if 1e-6 < to_boundary <= config.boundary_slack_s and keep + to_boundary <= gap:
+                keep += to_boundary
+            if keep > 0:
+                plan.windows.append((gap_start, gap_start + keep))
+                compact += keep
+        plan.windows.append((segment.start_s, segment.end_s))
+        compact += segment.duration_s
+
+    # Contiguous windows (pause fully kept) read better as one span
+    merged = []
+    for start, end in plan.windows:
+        if merged and abs(merged[-1][1] - start) < 1e-6:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    plan.windows = merged
+    return plan
+
+
+def detect_segments(audio_bytes: bytes, config: SegmentConfig = None) -> Tuple[List[Segment], float]:
+    """
+    Decode audio and classify it into speech and silence
+
+    Returns:
+        (segments, duration_s)
+    """
+    import librosa
+    import numpy as np
+
+    samples, sr = librosa.load(io.BytesIO(audio_bytes), sr=ANALYSIS_SR, mono=True)
+    duration_s = len(samples) / float(sr)
+    rms = librosa.feature.rms(y=samples, frame_length=FRAME_LENGTH, hop_length=HOP_LENGTH)[0]
+    levels_db = librosa.amplitude_to_db(rms, ref=np.max)
+    segments = segments_from_levels(levels_db.tolist(), HOP_LENGTH / float(sr), duration_s, config)
+    return segments, duration_s
+
+
+def analyze(audio_bytes: bytes, clip_s: float = 5.0, config: SegmentConfig = None) -> SegmentPlan:
+    """Detect segments and plan the compacted render for a track"""
+    segments, duration_s = detect_segments(audio_bytes, config)
+    return plan_segments(segments, duration_s, clip_s=clip_s, config=config)
+
+
+def compact_audio(audio_bytes: bytes, plan: SegmentPlan) -> bytes:
+    """Concatenate the plan's windows into a WAV at the source sample rate"""
+    import librosa
+    import numpy as np
+    import soundfile as sf
+
+    samples, sr = librosa.load(io.BytesIO(audio_bytes), sr=None, mono=True)
+    pieces = [samples[int(start * sr):int(end * sr)] for start, end in plan.windows]
+    buffer = io.BytesIO()
+    sf.write(buffer, np.concatenate(pieces) if pieces else samples[:0], sr, format="WAV")
+    return buffer.getvalue()
+
+
+def compact_video(video_bytes: bytes, plan: SegmentPlan) -> bytes:
+    """
+    Keep only the plan's windows of a video on the original timeline
+
+    Used for pose videos, which follow the original audio: the render sees
+    the compacted audio, so its pose frames must be compacted the same way.
+    Windows past the end of the video simply contribute no frames.
+    """
+    keep = "+".join(f"gte(t,{start:.3f})*lt(t,{end:.3f})" for start, end in plan.windows)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = Path(tmpdir) / "source.mp4"
+        output = Path(tmpdir) / "compact.mp4"
+        source.write_bytes(video_bytes)
+        cmd = [
+            "ffmpeg", "-y", "-loglevel", "error", "-i", str(source),
+            "-vf", f"select='{keep}',setpts=N/FRAME_RATE/TB",
+            "-an", "-c:v", "libx264", "-pix_fmt", "yuv420p", str(output),
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Compacting video failed: {result.stderr}")
+        return output.read_bytes()
+
+
+def frame_sources(plan: SegmentPlan, fps: float, loop_s: float = 0.5) -> List[int]:
+    """
+    Compacted-video frame index for every frame of the original timeline
+
+    Rendered windows map one to one. Dropped spans ping-pong over the
+    `loop_s` of generated frames next to them (the kept pause before a
+    dropped gap, or the first frames for a dropped intro), which keeps idle
+    motion alive instead of freezing.
+
+    Indices never look back further than `loop_s` from the newest one so
+    far, except into the first `loop_s` of frames; FrameBuffer relies on
+    this. A window can start a frame early or late against the previous
+    one, which keeps every window within one frame of its audio.
+    """
+    total_out = round(plan.duration_s * fps)
+    compact_frames = max(1, round(plan.compact_s * fps))
+    loop = max(1, round(loop_s * fps))
+
+    # (original start frame, original end frame, compacted start frame). The
+    # compacted offset is rounded from exact seconds so per-window rounding
+    # cannot accumulate and drift the video away from the audio
+    spans = []
+    compact_s = 0.0
+    for start, end in plan.windows:
+        spans.append((round(start * fps), round(end * fps), round(compact_s * fps)))
+        compact_s += end - start
+
+    def ping_pong(anchor: int, offset: int, backwards: bool) -> int:
+        lo = max(0, anchor - loop + 1) if backwards else anchor
+        hi = anchor if backwards else min(compact_frames - 1, anchor + loop - 1)
+        period = max(1, 2 * (hi - lo))
+        step = offset % period
+        position = step if step <= hi - lo else period - step
+        index = hi - position if backwards else lo + position
+        return min(compact_frames - 1, max(0, index))
+
+    sources = []
+    span_index = 0
+    for frame in range(total_out):
+        while span_index < len(spans) and frame >= spans[span_index][1]:
+            span_index += 1
+        if span_index < len(spans) and frame >= spans[span_index][0]:
+            first, _, compact_start = spans[span_index]
+            sources.append(min(compact_frames - 1, compact_start + frame - first))
+        elif span_index == 0:
+            # Dropped intro: loop the first generated frames
+            sources.append(ping_pong(0, spans[0][0] - frame if spans else frame, backwards=False))
+        else:
+            # Dropped pause or outro: loop back from the last frame rendered before it
+            _, previous_end, previous_compact = spans[span_index - 1]
+            anchor = previous_compact + (previous_end - spans[span_index - 1][0]) - 1
+            sources.append(ping_pong(anchor, frame - previous_end + 1, backwards=True))
+    return sources
+
+
+class FrameBuffer:
+    """
+    Random access to a sequentially decoded video within a bounded window
+
+    Keeps the first `head` frames and the most recent `tail` frames, decoding
+    further only when a later frame is asked for, so memory stays constant
+    however long the video is.
+
+    Args:
+        read: Returns the next frame, or None at the end (e.g. wraps
+            cv2.VideoCapture.read)
+        head: Frames kept from the start
+        tail: Most recent frames kept
+    """
+
+    def __init__(self, read: Callable[[], Any], head: int, tail: int):
+        self._read = read
+        self._head_size = head
+        self.head: List[Any] = []
+        self.tail = collections.deque(maxlen=max(1, tail))
+        self.count = 0
+        self.exhausted = False
+
+    def _advance(self) -> bool:
+        frame = self._read()
+        if frame is None:
+            self.exhausted = True
+            return False
+        if self.count < self._head_size:
+            self.head.append(frame)
+        self.tail.append(frame)
+        self.count += 1
+        return True
+
+    def get(self, index: int):
+        """
+        Frame `index`; past the end of the video, the last frame
+
+        Raises:
+            RuntimeError: The video has no frames, or the frame has already
+                left the window
+        """
+        while index >= self.count and not self.exhausted:
+            self._advance()
+        if self.count == 0:
+            raise RuntimeError("Generated video has no frames")
+        index = min(index, self.count - 1)
+        if index < len(self.head):
+            return self.head[index]
+        behind = self.count - index
+        if behind > len(self.tail):
+            raise RuntimeError(f"Frame {index} is no longer buffered ({self.count} decoded)")
+        return self.tail[-behind]
+
+
+def expand_video(video_bytes: bytes, audio_bytes: bytes, plan: SegmentPlan, loop_s: float = 0.5) -> bytes:
+    """
+    Rebuild the original timeline from a render of the compacted audio
+
+    Args:
+        video_bytes: MP4 rendered from compact_audio()
+        audio_bytes: Original (uncompacted) audio, muxed into the output
+        plan: The plan the compacted audio was built from
+        loop_s: Length of generated motion looped over dropped spans
+
+    Returns:
+        H.264/AAC MP4 covering the full original audio
+    """
+    import cv2
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmpdir_path = Path(tmpdir)
+        source_path = tmpdir_path / "compact.mp4"
+        frames_path = tmpdir_path / "frames.mp4"
+        audio_path = tmpdir_path / "audio"
+        output_path = tmpdir_path / "output.mp4"
+        source_path.write_bytes(video_bytes)
+        audio_path.write_bytes(audio_bytes)
+
+        capture = cv2.VideoCapture(str(source_path))
+        if not capture.isOpened():
+            raise RuntimeError("Could not open generated video")
+        fps = capture.get(cv2.CAP_PROP_FPS)
+        if fps <= 0:
+            capture.release()
+            raise RuntimeError("Generated video has no frame rate")
+
+        def read_frame():
+            ok, frame = capture.read()
+            return frame if ok else None
+
+        loop = max(1, round(loop_s * fps))
+        frames = FrameBuffer(read_frame, head=loop, tail=loop + 1)
+        sources = frame_sources(plan, fps, loop_s)
+        try:
+            first = frames.get(0)
+            height, width = first.shape[:2]
+            writer = cv2.VideoWriter(str(frames_path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+            try:
+                for index in sources:
+                    writer.write(frames.get(index))
+            finally:
+                writer.release()
+        finally:
+            capture.release()
+        print(f"Expanded {frames.count} rendered frames to {len(sources)} ({plan.skipped_s:.1f}s filled)")
+
+        cmd = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-i", str(frames_path), "-i", str(audio_path),
+            "-map", "0:v:0", "-map", "1:a:0", "-c:a", "aac", "-shortest",
+            "-c:v", "libx264", "-pix_fmt", "yuv420p", str(output_path),
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Muxing expanded video failed: {result.stderr}")
+        return output_path.read_bytes()
@@ -0,0 +1,254 @@
+"""
+Predictive warm pool controller for Wan2S2VModel
+
+`scaledown_window` alone either keeps idle A100s around or lets traffic
+spikes hit multi-minute cold starts. This controller looks at queue depth,
+arrival rate and recent cold-start durations and picks `min_containers` and
+`buffer_containers` for the GPU class, with schedule-based overrides for
+known peak hours.
+
+Decisions are pure functions of an Observation so policies can be replayed
+offline against recorded traces (see simulate_warm_pool.py).
+"""
+
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+
+DEFAULT_COLD_START_S = 180.0  # Scheduling + image pull + container startup
+DEFAULT_JOB_S = 900.0  # Typical 720p render
+
+
+@dataclass
+class PeakWindow:
+    """
+    Known busy period with a floor on warm containers
+
+    Hours are UTC and `end_hour` is exclusive. Windows may wrap midnight
+    (e.g. start_hour=22, end_hour=2). `weekdays` uses Monday=0.
+    """
+
+    start_hour: int
+    end_hour: int
+    min_containers: int = 1
+    buffer_containers: int = 0
+    weekdays: tuple = (0, 1, 2, 3, 4, 5, 6)
+
+    def active(self, when: datetime) -> bool:
+        if when.weekday() not in self.weekdays:
+            return False
+        if self.start_hour <= self.end_hour:
+            return self.start_hour <= when.hour < self.end_hour
+        return when.hour >= self.start_hour or when.hour < self.end_hour
+
+
+@dataclass
+class WarmPoolPolicy:
+    """Tunables for WarmPoolController"""
+
+    # Hard bounds on what the controller may request
+    max_min_containers: int = 4
+    max_buffer_containers: int = 2
+    # Fraction of steady-state demand (Little's law) kept warm as the floor
+    demand_fraction: float = 1.0
+    # Keep enough spare capacity for arrivals expected during one cold start
+    cover_cold_start: bool = True
+    # A warm floor container must be expected to be busy at least this share of the time
+    min_demand: float = 0.5
+    # Buffer only when at least this many arrivals are expected during a cold start
+    min_cold_start_arrivals: float = 0.5
+    # Hold a higher decision this long before scaling back down
+    scale_down_hold_s: float = 600.0
+    peak_windows: List[PeakWindow] = field(default_factory=list)
+
+
+@dataclass
+class Observation:
+    """Snapshot of the system at decision time"""
+
+    now: float  # Unix timestamp
+    queue_depth: int = 0
+    running: int = 0
+    arrivals_per_s: float = 0.0
+    cold_start_s: float = DEFAULT_COLD_START_S
+    job_s: float = DEFAULT_JOB_S
+
+
+@dataclass
+class Decision:
+    """Autoscaler settings to apply to the GPU class"""
+
+    min_containers: int
+    buffer_containers: int
+    reason: str = ""
+
+    def as_dict(self) -> dict:
+        return {
+            "min_containers": self.min_containers,
+            "buffer_containers": self.buffer_containers,
+            "reason": self.reason,
+        }
+
+
+class WarmPoolController:
+    """
+    Picks min/buffer warm containers from an Observation
+
+    - min_containers follows steady-state demand: arrival rate x job time,
+      rounded to the nearest container and only once demand reaches
+      `min_demand` (a single arrival must not pin an idle A100)
+    - buffer_containers covers arrivals expected during one cold start, once
+      at least `min_cold_start_arrivals` are expected
+    - Queue depth adds nothing: Modal already starts containers for queued
+      inputs, and the dispatcher only queues when every GPU slot is busy
+    - Peak windows raise both values to their configured floors
+    - Scale-down is delayed by `scale_down_hold_s` to avoid flapping
+    """
+
+    def __init__(self, policy: WarmPoolPolicy = None):
+        self.policy = policy or WarmPoolPolicy()
+        self._last: Optional[Decision] = None
+        self._last_raised_at = 0.0
+
+    def target(self, obs: Observation) -> Decision:
+        """Raw decision for an observation, without hysteresis"""
+        policy = self.policy
+        reasons = []
+
+        demand = obs.arrivals_per_s * obs.job_s * policy.demand_fraction
+        min_containers = _round_half_up(demand) if demand >= policy.min_demand else 0
+        if min_containers:
+            reasons.append(f"demand={demand:.2f}")
+
+        buffer_containers = 0
+        if policy.cover_cold_start and obs.arrivals_per_s > 0:
+            expected = obs.arrivals_per_s * obs.cold_start_s
+            if expected >= policy.min_cold_start_arrivals:
+                buffer_containers = _round_half_up(expected)
+                reasons.append(f"cold_start_arrivals={expected:.2f}")
+
+        when = datetime.fromtimestamp(obs.now, tz=timezone.utc)
+        for window in policy.peak_windows:
+            if window.active(when):
+                min_containers = max(min_containers, window.min_containers)
+                buffer_containers = max(buffer_containers, window.buffer_containers)
+                reasons.append(f"peak {window.start_hour:02d}-{window.end_hour:02d}h")
+
+        return Decision(
+            min_containers=min(min_containers, policy.max_min_containers),
+            buffer_containers=min(buffer_containers, policy.max_buffer_containers),
+            reason=", ".join(reasons) or "idle",
+        )
+
+    def decide(self, obs: Observation) -> Decision:
+        """Decision for an observation with scale-down hysteresis applied"""
+        target = self.target(obs)
+        last = self._last
+        if last is None or obs.now - self._last_raised_at >= self.policy.scale_down_hold_s:
+            decision = target
+        else:
+            decision = Decision(
+                min_containers=max(target.min_containers, last.min_containers),
+                buffer_containers=max(target.buffer_containers, last.buffer_containers),
+                reason=target.reason,
+            )
+        if (
+            target.min_containers >= decision.min_containers
+            and target.buffer_containers >= decision.buffer_containers
+        ):
+            self._last_raised_at = obs.now
+        else:
+            decision.reason = f"holding ({target.reason})"
+        self._last = decision
+        return decision
+
+    def state(self) -> dict:
+        """Hysteresis state, for persisting between scheduled runs"""
+        return {
+            "last": self._last.as_dict() if self._last else None,
+            "last_raised_at": self._last_raised_at,
+        }
+
+    def load_state(self, state: dict):
+        """Restore state saved by state()"""
+        last = (state or {}).get("last")
+        self._last = Decision(**last) if last else None
+        self._last_raised_at = (state or {}).get("last_raised_at", 0.0)
+
+
+class MetricsWindow:
+    """
+    Rolling arrival and cold-start statistics
+
+    Kept in the web container and serialised to a modal.Dict so the
+    scheduled controller can read it.
+    """
+
+    def __init__(self, window_s: float = 900.0, clock: Callable[[], float] = time.time):
+        self.window_s = window_s
+        self.clock = clock
+        self.arrivals = deque()
+        self.cold_starts = deque(maxlen=20)
+        self.job_durations = deque(maxlen=50)
+
+    def _trim(self, now: float):
+        while self.arrivals and now - self.arrivals[0] > self.window_s:
+            self.arrivals.popleft()
+
+    def record_arrival(self):
+        now = self.clock()
+        self.arrivals.append(now)
+        self._trim(now)
+
+    def record_cold_start(self, seconds: float):
+        self.cold_starts.append(seconds)
+
+    def record_job(self, seconds: float):
+        self.job_durations.append(seconds)
+
+    def arrivals_per_s(self) -> float:
+        self._trim(self.clock())
+        return len(self.arrivals) / self.window_s
+
+    def observation(self, queue_depth: int = 0, running: int = 0) -> Observation:
+        return Observation(
+            now=self.clock(),
+            queue_depth=queue_depth,
+            running=running,
+            arrivals_per_s=self.arrivals_per_s(),
+            cold_start_s=_median(self.cold_starts, DEFAULT_COLD_START_S),
+            job_s=_median(self.job_durations, DEFAULT_JOB_S),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "window_s": self.window_s,
+            "arrivals": list(self.arrivals),
+            "cold_starts": list(self.cold_starts),
+            "job_durations": list(self.job_durations),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, clock: Callable[[], float] = time.time) -> "MetricsWindow":
+        window = cls(window_s=data.get("window_s", 900.0), clock=clock)
+        window.arrivals.extend(data.get("arrivals", []))
+        window.cold_starts.extend(data.get("cold_starts", []))
+        window.job_durations.extend(data.get("job_durations", []))
+        return window
+
+
+def _round_half_up(value: float) -> int:
+    return int(math.floor(value + 0.5))
+
+
+def _median(values, default: float) -> float:
+    values = sorted(values)
+    if not values:
+        return default
+    mid = len(values) // 2
+    if len(values) % 2:
+        return values[mid]
+    return (values[mid - 1] + values[mid]) / 2
@@ -0,0 +1,232 @@
+"""
+Manifest-driven batch rendering
+
+Reads a JSONL or CSV manifest with one job per line/row:
+
+    {"image": "faces/a.jpg", "audio": "vo/a.wav", "prompt": "...", "resolution": "720p", "output": "out/a.mp4"}
+
+    image,audio,prompt,resolution,output
+    faces/a.jpg,vo/a.wav,A person talking,720p,out/a.mp4
+
+Optional columns: `id`, `num_clips`, `pose_video`. Relative paths are
+resolved against the manifest's directory.
+
+run_batch() fans jobs out with bounded concurrency through caller-supplied
+submit/poll functions (Modal `spawn` / `FunctionCall.get` in wan2_modal.py),
+writes each video as soon as it finishes, skips jobs whose output already
+exists and writes a JSON run report with per-job timings.
+"""
+
+import csv
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+REQUIRED_FIELDS = ("image", "audio", "output")
+
+
+@dataclass
+class BatchJob:
+    """One render described by a manifest entry"""
+
+    job_id: str
+    image: str
+    audio: str
+    output: str
+    prompt: str = ""
+    resolution: str = "720p"
+    num_clips: Optional[int] = None
+    pose_video: Optional[str] = None
+
+    def generate_kwargs(self) -> dict:
+        """Arguments for Wan2S2VModel.generate"""
+        return {
+            "image_bytes": Path(self.image).read_bytes(),
+            "audio_bytes": Path(self.audio).read_bytes(),
+            "prompt": self.prompt,
+            "resolution": self.resolution,
+            "num_clips": self.num_clips,
+            "pose_video_bytes": Path(self.pose_video).read_bytes() if self.pose_video else None,
+        }
+
+
+@dataclass
+class JobResult:
+    """Outcome of one job, as written to the run report"""
+
+    job_id: str
+    output: str
+    status: str = "pending"  # pending, skipped, done, failed
+    submitted_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    seconds: Optional[float] = None
+    bytes: Optional[int] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class BatchReport:
+    """Run report for a manifest"""
+
+    manifest: str
+    started_at: float
+    finished_at: Optional[float] = None
+    jobs: List[JobResult] = field(default_factory=list)
+
+    def counts(self) -> dict:
+        counts = {}
+        for job in self.jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    def write(self, path: Path):
+        data = asdict(self)
+        data["counts"] = self.counts()
+        Path(path).write_text(json.dumps(data, indent=2))
+
+
+def _resolve(base: Path, value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    path = Path(value).expanduser()
+    return str(path if path.is_absolute() else base / path)
+
+
+def load_manifest(path: str) -> List[BatchJob]:
+    """
+    Parse a .jsonl or .csv manifest into BatchJobs
+
+    Raises:
+        ValueError: On missing required fields, bad resolutions or duplicate outputs
+    """
+    manifest_path = Path(path)
+    base = manifest_path.parent
+    if manifest_path.suffix.lower() == ".csv":
+        with open(manifest_path, newline="") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with open(manifest_path) as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    jobs = []
+    outputs = set()
+    for index, row in enumerate(rows, start=1):
+        row = {key.strip(): value for key, value in row.items() if key}
+        missing = [name for name in REQUIRED_FIELDS if not row.get(name)]
+        if missing:
+            raise ValueError(f"Manifest entry {index} is missing: {', '.join(missing)}")
+        resolution = row.get("resolution") or "720p"
+        if resolution not in ("480p", "720p"):
+            raise ValueError(f"Manifest entry {index} has invalid resolution '{resolution}'")
+        output = _resolve(base, row["output"])
+        if output in outputs:
+            raise ValueError(f"Manifest entry {index} reuses output path {row['output']}")
+        outputs.add(output)
+        num_clips = row.get("num_clips")
+        jobs.append(
+            BatchJob(
+                job_id=str(row.get("id") or index),
+                image=_resolve(base, row["image"]),
+                audio=_resolve(base, row["audio"]),
+                output=output,
+                prompt=row.get("prompt") or "",
+                resolution=resolution,
+                num_clips=int(num_clips) if num_clips not in (None, "") else None,
+                pose_video=_resolve(base, row.get("pose_video")),
+            )
+        )
+    return jobs
+
+
+def run_batch(
+    jobs: List[BatchJob],
+    submit: Callable[[BatchJob], Any],
+    poll: Callable[[Any], Optional[bytes]],
+    max_concurrency: int = 4,
+    report_path: Optional[str] = None,
+    manifest: str = "",
+    overwrite: bool = False,
+    clock: Callable[[], float] = time.time,
+) -> BatchReport:
+    """
+    Render jobs with at most `max_concurrency` in flight
+
+    Args:
+        jobs: Jobs from load_manifest()
+        submit: Starts a job and returns a handle (e.g. a FunctionCall)
+        poll: Returns the video bytes for a finished handle, None if still
+            running; raises if the job failed
+        max_concurrency: Jobs in flight at once
+        report_path: Where to write the JSON report (updated after every job)
+        manifest: Manifest path recorded in the report
+        overwrite: Re-render jobs whose output already exists
+
+    Returns:
+        The final BatchReport
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+
+    report = BatchReport(manifest=manifest, started_at=clock())
+    queue = []
+    for job in jobs:
+        result = JobResult(job_id=job.job_id, output=job.output)
+        report.jobs.append(result)
+        output = Path(job.output)
+        if not overwrite and output.exists() and output.stat().st_size > 0:
+            result.status = "skipped"
+            print(f"⏭️  [{job.job_id}] Output exists, skipping: {job.output}")
+        else:
+            queue.append((job, result))
+
+    def save_report():
+        if report_path:
+            report.write(report_path)
+
+    running = []
+    while queue or running:
+        while queue and len(running) < max_concurrency:
+            job, result = queue.pop(0)
+            try:
+                handle = submit(job)
+            except Exception as e:
+                result.status = "failed"
+                result.error = f"submit: {e}"
+                print(f"❌ [{job.job_id}] Could not submit: {e}")
+                save_report()
+                continue
+            result.submitted_at = clock()
+            running.append((job, result, handle))
+            print(f"🚀 [{job.job_id}] Submitted ({len(running)} in flight, {len(queue)} waiting)")
+
+        for entry in list(running):
+            job, result, handle = entry
+            try:
+                video_bytes = poll(handle)
+            except Exception as e:
+                video_bytes = None
+                result.status = "failed"
+                result.error = str(e)
+                print(f"❌ [{job.job_id}] Failed: {e}")
+            if video_bytes is None and result.status != "failed":
+                continue
+
+            running.remove(entry)
+            result.finished_at = clock()
+            result.seconds = round(result.finished_at - result.submitted_at, 1)
+            if result.status != "failed":
+                output = Path(job.output)
+                output.parent.mkdir(parents=True, exist_ok=True)
+                partial = output.with_name(output.name + ".part")
+                partial.write_bytes(video_bytes)
+                partial.replace(output)
+                result.status = "done"
+                result.bytes = len(video_bytes)
+                print(f"✅ [{job.job_id}] Saved {job.output} ({result.seconds:.0f}s)")
+            save_report()
+
+    report.finished_at = clock()
+    save_report()
+    return report
@@ -0,0 +1,81 @@
+"""
+Cancellable generation subprocess
+
+`subprocess.run` keeps a generation going for up to 30 minutes after the
+client has gone away. run_cancellable() instead polls a cancellation check
+while the process runs and, when it fires, terminates the whole process
+group: SIGTERM first (wan2_runner.py turns it into a clean exit between
+operations, which releases GPU memory), SIGKILL after a grace period.
+"""
+
+import os
+import signal
+import subprocess
+import time
+from typing import Callable, List
+
+
+class JobCancelled(RuntimeError):
+    """The generation was cancelled before it finished"""
+
+
+def _signal_group(process: subprocess.Popen, sig: int):
+    try:
+        os.killpg(process.pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+def terminate(process: subprocess.Popen, grace_s: float = 15.0):
+    """SIGTERM the process group, then SIGKILL if it has not exited in time"""
+    _signal_group(process, signal.SIGTERM)
+    try:
+        process.wait(timeout=grace_s)
+    except subprocess.TimeoutExpired:
+        _signal_group(process, signal.SIGKILL)
+        process.wait()
+
+
+def run_cancellable(
+    cmd: List[str],
+    is_cancelled: Callable[[], bool],
+    timeout: float = 1800,
+    poll_interval_s: float = 2.0,
+    grace_s: float = 15.0,
+    **popen_kwargs,
+) -> subprocess.CompletedProcess:
+    """
+    Run a command like subprocess.run(capture_output=True, text=True),
+    checking is_cancelled() every poll_interval_s
+
+    Raises:
+        JobCancelled: is_cancelled() returned True; the process was terminated
+        subprocess.TimeoutExpired: The process ran longer than `timeout`
+    """
+    if is_cancelled():
+        raise JobCancelled("Job was cancelled before it started")
+
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        start_new_session=True,  # Own process group, so children die with it
+        **popen_kwargs,
+    )
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            stdout, stderr = process.communicate(timeout=poll_interval_s)
+            return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+        except subprocess.TimeoutExpired:
+            pass
+
+        if is_cancelled():
+            terminate(process, grace_s)
+            process.communicate()
+            raise JobCancelled("Job was cancelled")
+        if time.monotonic() > deadline:
+            terminate(process, grace_s)
+            stdout, stderr = process.communicate()
+            raise subprocess.TimeoutExpired(cmd, timeout, output=stdout, stderr=stderr)
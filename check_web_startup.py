@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Startup-time budget check for the web endpoint
+
+Imports wan2_modal and builds the FastAPI app in a fresh interpreter, the
+way a new web container does, and fails if:
+- import + app construction exceeds the budget (median of several runs)
+- any heavy GPU-side library (torch, cv2, diffusers, ...) gets imported
+
+`modal` itself is imported before the timer starts, since the Modal runtime
+has already loaded it when user code runs.
+
+Usage:
+    python check_web_startup.py                 # 500 ms budget
+    python check_web_startup.py --budget-ms 400 --runs 7
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+HEAVY_MODULES = (
+    "torch",
+    "torchaudio",
+    "cv2",
+    "numpy",
+    "librosa",
+    "diffusers",
+    "transformers",
+    "huggingface_hub",
+    "PIL",
+)
+
+PROBE = """
+import json
+import sys
+import time
+
+import modal
+
+start = time.perf_counter()
+import wan2_modal
+imported = time.perf_counter()
+wan2_modal.fastapi_app.local()
+built = time.perf_counter()
+
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "total_ms": (built - start) * 1000,
+    "heavy": [name for name in %r if name in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def measure() -> dict:
+    """Run the probe in a fresh interpreter and return its timings"""
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=Path(__file__).resolve().parent,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Web app failed to start:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check web endpoint startup time")
+    parser.add_argument("--budget-ms", type=float, default=500.0, help="Max median import + build time")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to measure")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("Wan2.2 S2V Web Startup Check")
+    print("=" * 70)
+
+    samples = [measure() for _ in range(args.runs)]
+    import_ms = statistics.median(s["import_ms"] for s in samples)
+    total_ms = statistics.median(s["total_ms"] for s in samples)
+    heavy = sorted({name for s in samples for name in s["heavy"]})
+
+    print(f"Import wan2_modal:   {import_ms:.0f} ms (median of {args.runs})")
+    print(f"Import + build app:  {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"Heavy modules:       {', '.join(heavy) if heavy else 'none'}")
+
+    results = [
+        ("Startup within budget", total_ms <= args.budget_ms),
+        ("No heavy imports", not heavy),
+    ]
+    print("=" * 70)
+    for name, passed in results:
+        print(f"{'✅ PASS' if passed else '❌ FAIL'} - {name}")
+
+    return 0 if all(passed for _, passed in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+"""
+Per-clip render cache for incremental re-renders
+
+A tweak to one sentence of a long voice-over should not re-render the whole
+video. The audio is cut into fixed clip windows, and each clip gets a chained
+content hash:
+
+    hash[k] = sha256(audio window k, reference image, prompt, settings, hash[k-1])
+
+Wan2.2 S2V conditions every clip on the motion of the one before it, so the
+previous clip's hash stands in for that context: a change in clip k changes
+the hashes of k and everything after it, and nothing before it.
+
+Finished clips are stored on the `wan2-models` Volume by hash, and each job
+records its hash list. A new submission renders only from its first clip
+that is not in the store (with a seed derived from the base seed and that
+clip index, so renders are reproducible), cuts the result into clips, stores
+them and splices cached + new clips over the full audio.
+
+Hashing uses decoded PCM, so re-encoding the same audio does not invalidate
+clips. Clips unused for MAX_CLIP_AGE_S, and the least recently used ones past
+MAX_CACHE_BYTES, are evicted. librosa/numpy are imported lazily; ffmpeg does
+the cutting and splicing. Cutting and splicing check an optional is_cancelled() between
+ffmpeg runs, so a cancelled job stops there too.
+"""
+
+import hashlib
+import io
+import json
+import math
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from cancellation import JobCancelled
+
+CACHE_SUBDIR = "clip-cache"
+HASH_SR = 16000
+
+# Clip cache limits; least recently used clips are evicted past either
+MAX_CACHE_BYTES = 50 * 1024 ** 3
+MAX_CLIP_AGE_S = 30 * 24 * 3600
+
+# Job IDs name files on the Volume, so they are limited to a safe alphabet
+JOB_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def valid_job_id(job_id: str) -> bool:
+    """True if a job ID is safe to use as a file name and URL path segment"""
+    return bool(JOB_ID_PATTERN.fullmatch(job_id or ""))
+
+
+def clip_windows(duration_s: float, clip_s: float = 5.0) -> List[Tuple[float, float]]:
+    """Consecutive (start_s, end_s) clip windows covering the audio"""
+    count = max(1, math.ceil(duration_s / clip_s - 1e-6))
+    return [(k * clip_s, min(duration_s, (k + 1) * clip_s)) for k in range(count)]
+
+
+def clip_seed(base_seed: int, index: int) -> int:
+    """Deterministic seed for a render that starts at clip `index`"""
+    digest = hashlib.sha256(f"{base_seed}:{index}".encode()).digest()
+    return int.from_bytes(digest[:4], "big") & 0x7FFFFFFF
+
+
+def chain_hashes(
+    window_data: Sequence[bytes],
+    image_bytes: bytes,
+    prompt: str = "",
+    settings: dict = None,
+) -> List[str]:
+    """
+    Chained per-clip hashes
+
+    Args:
+        window_data: Canonical audio bytes of each clip window
+        image_bytes: Reference image
+        prompt: Text prompt
+        settings: Anything else that changes the pixels (resolution, seed, ...)
+    """
+    shared = hashlib.sha256()
+    shared.update(hashlib.sha256(image_bytes).digest())
+    shared.update(prompt.encode())
+    shared.update(json.dumps(settings or {}, sort_keys=True).encode())
+    shared_digest = shared.digest()
+
+    hashes = []
+    previous = b""
+    for data in window_data:
+        digest = hashlib.sha256()
+        digest.update(shared_digest)
+        digest.update(hashlib.sha256(data).digest())
+        digest.update(previous)
+        hashes.append(digest.hexdigest())
+        previous = digest.digest()
+    return hashes
+
+
+def first_missing(hashes: Sequence[str], available) -> Optional[int]:
+    """Index of the first clip that has to be rendered, None if all are cached"""
+    for index, clip_hash in enumerate(hashes):
+        if clip_hash not in available:
+            return index
+    return None
+
+
+def diff(new: Sequence[str], old: Sequence[str]) -> List[int]:
+    """Indices of clips in `new` that differ from the prior job's `old`"""
+    return [k for k, clip_hash in enumerate(new) if k >= len(old) or old[k] != clip_hash]
+
+
+def audio_windows(audio_bytes: bytes, clip_s: float = 5.0) -> Tuple[List[bytes], float]:
+    """
+    Decode audio and return each clip window as canonical PCM bytes
+
+    Returns:
+        (16 kHz mono int16 bytes per window, duration_s)
+    """
+    import librosa
+    import numpy as np
+
+    samples, sr = librosa.load(io.BytesIO(audio_bytes), sr=HASH_SR, mono=True)
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    duration_s = len(pcm) / float(sr)
+    windows = clip_windows(duration_s, clip_s)
+    return [pcm[int(start * sr):int(end * sr)].tobytes() for start, end in windows], duration_s
+
+
+def trim_audio(audio_bytes: bytes, start_s: float) -> bytes:
+    """WAV of the audio from start_s to the end, at the source sample rate"""
+    import librosa
+    import soundfile as sf
+
+    samples, sr = librosa.load(io.BytesIO(audio_bytes), sr=None, mono=True)
+    buffer = io.BytesIO()
+    sf.write(buffer, samples[int(start_s * sr):], sr, format="WAV")
+    return buffer.getvalue()
+
+
+def _ffmpeg(args: List[str], what: str):
+    result = subprocess.run(["ffmpeg", "-y", "-loglevel", "error", *args], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{what} failed: {result.stderr}")
+
+
+def trim_video(video_bytes: bytes, start_s: float) -> bytes:
+    """MP4 of a (pose) video from start_s to the end"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = Path(tmpdir) / "source.mp4"
+        output = Path(tmpdir) / "trimmed.mp4"
+        source.write_bytes(video_bytes)
+        _ffmpeg(
+            ["-ss", f"{start_s:.3f}", "-i", str(source), "-an", "-c:v", "libx264", "-pix_fmt", "yuv420p", str(output)],
+            "Trimming video",
+        )
+        return output.read_bytes()
+
+
+class ClipStore:
+    """Content-addressed clip files and per-job hash lists on a Volume"""
+
+    def __init__(self, root: str):
+        self.root = Path(root) / CACHE_SUBDIR
+        self.clips = self.root / "clips"
+        self.jobs = self.root / "jobs"
+
+    def path(self, clip_hash: str) -> Path:
+        return self.clips / clip_hash[:2] / f"{clip_hash}.mp4"
+
+    def available(self, hashes: Sequence[str]) -> set:
+        return {h for h in hashes if self.path(h).exists()}
+
+    def put(self, clip_hash: str, source: Path):
+        target = self.path(clip_hash)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = target.with_name(target.name + ".part")
+        shutil.copyfile(source, partial)
+        partial.replace(target)
+
+    def evict(
+        self,
+        max_bytes: int = MAX_CACHE_BYTES,
+        max_age_s: float = MAX_CLIP_AGE_S,
+        keep: Sequence[str] = (),
+        now: float = None,
+    ) -> int:
+        """
+        Delete clips unused for max_age_s, then the least recently used ones
+        until the cache fits in max_bytes
+
+        Clips in `keep` (the job being spliced) are marked as used and never
+        evicted. Job records older than max_age_s are removed too.
+
+        Returns:
+            Number of clips deleted
+        """
+        now = time.time() if now is None else now
+        kept = set()
+        for clip_hash in keep:
+            path = self.path(clip_hash)
+            if path.exists():
+                os.utime(path, (now, now))
+                kept.add(path)
+
+        clips = sorted(
+            ((path.stat().st_mtime, path.stat().st_size, path) for path in self.clips.glob("*/*.mp4")),
+            key=lambda clip: clip[0],
+        )
+        total = sum(size for _, size, _ in clips)
+        removed = 0
+        for mtime, size, path in clips:
+            if path in kept:
+                continue
+            if total <= max_bytes and now - mtime <= max_age_s:
+                # Sorted by age: every later clip is newer and fits too
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        for record in self.jobs.glob("*.json"):
+            if now - record.stat().st_mtime > max_age_s:
+                record.unlink(missing_ok=True)
+        if removed:
+            print(f"Evicted {removed} cached clips ({total / 1024 ** 3:.1f} GB kept)")
+        return removed
+
+    def job_path(self, job_id: str) -> Path:
+        """
+        Hash list file of a job
+
+        Raises:
+            ValueError: The job ID is not a plain name inside the jobs directory
+        """
+        path = self.jobs / f"{job_id}.json"
+        if not valid_job_id(job_id) or path.resolve().parent != self.jobs.resolve():
+            raise ValueError(f"Invalid job ID: {job_id!r}")
+        return path
+
+    def save_job(self, job_id: str, hashes: Sequence[str], **info):
+        path = self.job_path(job_id)
+        self.jobs.mkdir(parents=True, exist_ok=True)
+        record = {"job_id": job_id, "hashes": list(hashes), "created_at": time.time(), **info}
+        path.write_text(json.dumps(record, indent=2))
+
+    def load_job(self, job_id: str) -> Optional[dict]:
+        path = self.job_path(job_id)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text())
+
+    def store_render(
+        self,
+        video_path: Path,
+        hashes: Sequence[str],
+        windows: Sequence[Tuple[float, float]],
+        first: int,
+        is_cancelled: Callable[[], bool] = None,
+    ):
+        """
+        Cut a render that starts at clip `first` into clips and store them
+
+        Clips are re-encoded video-only so every stored clip starts on a
+        keyframe and splices cleanly.
+
+        Raises:
+            JobCancelled: is_cancelled() returned True before a cut
+        """
+        offset = windows[first][0]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for index in range(first, len(hashes)):
+                if is_cancelled and is_cancelled():
+                    raise JobCancelled(f"Job was cancelled while storing clip {index}")
+                start, end = windows[index]
+                clip_path = Path(tmpdir) / f"{index}.mp4"
+                _ffmpeg(
+                    [
+                        "-ss", f"{start - offset:.3f}", "-i", str(video_path), "-t", f"{end - start:.3f}",
+                        "-an", "-c:v", "libx264", "-pix_fmt", "yuv420p", str(clip_path),
+                    ],
+                    f"Cutting clip {index}",
+                )
+                self.put(hashes[index], clip_path)
+
+    def splice(
+        self,
+        hashes: Sequence[str],
+        audio_bytes: bytes,
+        is_cancelled: Callable[[], bool] = None,
+    ) -> bytes:
+        """Concatenate stored clips in order and mux the full audio"""
+        if is_cancelled and is_cancelled():
+            raise JobCancelled("Job was cancelled before splicing")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmpdir_path = Path(tmpdir)
+            listing = tmpdir_path / "clips.txt"
+            audio_path = tmpdir_path / "audio"
+            output_path = tmpdir_path / "output.mp4"
+            listing.write_text("".join(f"file '{self.path(h)}'\n" for h in hashes))
+            audio_path.write_bytes(audio_bytes)
+            _ffmpeg(
+                [
+                    "-f", "concat", "-safe", "0", "-i", str(listing), "-i", str(audio_path),
+                    "-map", "0:v:0", "-map", "1:a:0", "-c:v", "copy", "-c:a", "aac", "-shortest",
+                    str(output_path),
+                ],
+                "Splicing clips",
+            )
+            return output_path.read_bytes()
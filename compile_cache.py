@@ -0,0 +1,228 @@
+"""
+Persistent torch.compile cache for Wan2.2 S2V
+
+Compiling the 14B DiT with torch.compile speeds up every denoising step, but
+inductor and Triton artifacts live in /tmp by default, so each fresh
+container would pay the compilation cost again. Here the caches are kept on
+the `wan2-models` Volume, one directory per
+
+    torch version / GPU type / resolution bucket / output dims
+
+so a container only reuses kernels that were built for its exact setup.
+`--size` is an area, not a shape: the pipeline fits the reference image's
+aspect ratio into it, and the DiT is compiled with static shapes, so every
+output shape compiles separately. output_dims() predicts that shape so the
+cache is keyed on it, and warm-up covers the aspect ratios in
+WARMUP_ASPECTS.
+
+Nothing here imports torch at module level; the keying and persistence logic
+runs on CPU.
+"""
+
+import io
+import json
+import math
+import os
+import re
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+CACHE_SUBDIR = "compile-cache"
+MANIFEST_NAME = "manifest.json"
+
+# Reference image shapes (width, height) precompiled by warm-up. Larger than
+# any --size area, so they are scaled down like typical photos; images
+# smaller than the area keep their own size and compile separately.
+WARMUP_ASPECTS = {
+    "4:3": (1600, 1200),
+    "3:4": (1200, 1600),
+    "1:1": (1200, 1200),
+    "16:9": (1920, 1080),
+    "9:16": (1080, 1920),
+}
+
+
+def _slug(value: str) -> str:
+    """Filesystem-safe version of a key component"""
+    return re.sub(r"[^A-Za-z0-9._-]+", "-", value).strip("-") or "unknown"
+
+
+def detect_torch_version() -> str:
+    """Installed torch version including the CUDA build, e.g. 2.4.1+cu121"""
+    try:
+        import torch
+    except ImportError:
+        return "none"
+    return torch.__version__
+
+
+def detect_gpu_name() -> str:
+    """Name of the first visible GPU, or "cpu" when CUDA is unavailable"""
+    try:
+        import torch
+    except ImportError:
+        return "cpu"
+    if not torch.cuda.is_available():
+        return "cpu"
+    return torch.cuda.get_device_name(0)
+
+
+def output_dims(width: int, height: int, size: str, divisor: int = 64) -> Tuple[int, int]:
+    """
+    (width, height) the S2V pipeline renders for a reference image
+
+    Mirrors WanS2V.get_size_less_than_area: images larger than the `--size`
+    area are scaled down to fit it, smaller ones are kept, and both sides are
+    padded up to a multiple of `divisor` without exceeding the area. If no
+    scale satisfies that, the aspect ratio is fitted to the area and floored
+    to the divisor, but never above the source size.
+    """
+    target_w, target_h = (int(v) for v in size.split("*"))
+    area = target_w * target_h
+    if width * height <= area:
+        min_scale, max_scale = 0.1, 1.0
+    else:
+        d = divisor - 1
+        a, b, c = width * height, d * (width + height), d ** 2 - area
+        min_scale = (-b + math.sqrt(b ** 2 - 2 * a * c)) / (2 * a)
+        max_scale = math.sqrt(area / (width * height))
+    for i in range(100):
+        scale = max_scale - (max_scale - min_scale) * i / 100
+        padded_w = -(-int(width * scale) // divisor) * divisor
+        padded_h = -(-int(height * scale) // divisor) * divisor
+        if padded_w * padded_h <= area:
+            return padded_w, padded_h
+    # Upstream fallback: fit the aspect ratio to the area, never above the source
+    aspect = width / height
+    target_w = int((area * aspect) ** 0.5 // divisor * divisor)
+    target_h = int((area / aspect) ** 0.5 // divisor * divisor)
+    if target_w >= width or target_h >= height:
+        target_w = int(width // divisor * divisor)
+        target_h = int(height // divisor * divisor)
+    return target_w, target_h
+
+
+def image_size(image_bytes: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) of an encoded image, or None if it cannot be read"""
+    try:
+        from PIL import Image
+
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            return image.size
+    except Exception:
+        return None
+
+
+def cache_key(torch_version: str, gpu_name: str, size: str, dims: Tuple[int, int] = None) -> str:
+    """
+    Cache key for a compiled configuration
+
+    Args:
+        torch_version: e.g. "2.4.1+cu121"
+        gpu_name: e.g. "NVIDIA A100-SXM4-80GB"
+        size: Resolution bucket as passed to --size, e.g. "1024*704"
+        dims: Output (width, height) from output_dims(); None when unknown
+
+    Returns:
+        Key usable as a directory name
+    """
+    parts = [
+        f"torch-{_slug(torch_version)}",
+        _slug(gpu_name),
+        _slug(size.replace("*", "x")),
+    ]
+    if dims:
+        parts.append(f"{dims[0]}x{dims[1]}")
+    return "__".join(parts)
+
+
+def cache_dir(root: str, key: str) -> Path:
+    """Directory holding the caches for one key"""
+    return Path(root) / CACHE_SUBDIR / key
+
+
+def compile_env(directory: Path) -> Dict[str, str]:
+    """
+    Environment variables pointing inductor and Triton at a cache directory
+
+    Set these on the generation subprocess before torch is imported.
+    """
+    directory = Path(directory)
+    return {
+        "TORCHINDUCTOR_CACHE_DIR": str(directory / "inductor"),
+        "TRITON_CACHE_DIR": str(directory / "triton"),
+        "TORCHINDUCTOR_FX_GRAPH_CACHE": "1",
+        "TORCHINDUCTOR_AUTOGRAD_CACHE": "1",
+    }
+
+
+def prepare(directory: Path) -> Dict[str, str]:
+    """Create the cache directories and return compile_env() for them"""
+    env = compile_env(directory)
+    for name in ("TORCHINDUCTOR_CACHE_DIR", "TRITON_CACHE_DIR"):
+        Path(env[name]).mkdir(parents=True, exist_ok=True)
+    return env
+
+
+def snapshot(directory: Path) -> Dict[str, int]:
+    """Relative path -> size of every file under a cache directory"""
+    directory = Path(directory)
+    if not directory.exists():
+        return {}
+    return {
+        str(path.relative_to(directory)): path.stat().st_size
+        for path in directory.rglob("*")
+        if path.is_file()
+    }
+
+
+def changed(before: Dict[str, int], after: Dict[str, int]) -> bool:
+    """True if a run added or rewrote cache files (Volume needs a commit)"""
+    return before != after
+
+
+def read_manifest(directory: Path) -> Optional[dict]:
+    """Metadata written by write_manifest(), or None for an empty cache"""
+    path = Path(directory) / MANIFEST_NAME
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(directory: Path, key: str, **info) -> dict:
+    """Record what was compiled into a cache directory and when"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    files = snapshot(directory)
+    files.pop(MANIFEST_NAME, None)
+    manifest = {
+        "key": key,
+        "updated_at": time.time(),
+        "files": len(files),
+        "bytes": sum(files.values()),
+        **info,
+    }
+    (directory / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def list_caches(root: str) -> Dict[str, dict]:
+    """Key -> manifest for every warmed cache under a Volume root"""
+    base = Path(root) / CACHE_SUBDIR
+    if not base.exists():
+        return {}
+    caches = {}
+    for directory in sorted(base.iterdir()):
+        manifest = read_manifest(directory)
+        if manifest is not None:
+            caches[directory.name] = manifest
+    return caches
+
+
+def compile_enabled() -> bool:
+    """Opt-in switch, set via WAN2_COMPILE=1"""
+    return os.environ.get("WAN2_COMPILE", "0").lower() in ("1", "true", "yes")
@@ -0,0 +1,202 @@
+"""
+Frame interpolation for low-frame-rate generation
+
+The DiT can render a clip at 12 or 16 fps (with audio conditioning aligned to
+that rate) and this CPU stage synthesizes the missing frames to reach the
+24 fps API output, then muxes the original audio back in. Trading a little
+motion fidelity for GPU time works well for talking-head clips.
+
+Methods:
+- "flow": Farneback optical flow in both directions, each neighbour warped to
+  the intermediate time and blended (motion-compensated)
+- "blend": plain cross-fade between neighbouring frames (fast fallback)
+
+OpenCV and numpy are imported lazily so the module can be imported anywhere.
+"""
+
+import subprocess
+import tempfile
+from fractions import Fraction
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+
+OUTPUT_FPS = 24
+LOW_FPS_CHOICES = (12, 16)
+METHODS = ("flow", "blend")
+
+
+def output_schedule(num_frames: int, src_fps: float, dst_fps: float) -> List[Tuple[int, float]]:
+    """
+    Source position of every output frame
+
+    Returns a list of (index, alpha): output frame k lies between source
+    frames `index` and `index + 1`, `alpha` of the way to the latter.
+    The output covers the same duration as the input; past the last source
+    frame it is held.
+    """
+    if num_frames < 1:
+        return []
+    ratio = Fraction(src_fps).limit_denominator(1000) / Fraction(dst_fps).limit_denominator(1000)
+    duration_frames = Fraction(num_frames)
+    schedule = []
+    k = 0
+    while True:
+        position = k * ratio
+        if position >= duration_frames:
+            break
+        index = int(position)
+        alpha = float(position - index)
+        schedule.append((index, alpha))
+        k += 1
+    return schedule
+
+
+def _flow_interpolate(frame_a, frame_b, alpha: float):
+    """Motion-compensated frame at `alpha` between frame_a and frame_b"""
+    import cv2
+    import numpy as np
+
+    gray_a = cv2.cvtColor(frame_a, cv2.COLOR_BGR2GRAY)
+    gray_b = cv2.cvtColor(frame_b, cv2.COLOR_BGR2GRAY)
+    params = dict(pyr_scale=0.5, levels=3, winsize=15, iterations=3, poly_n=5, poly_sigma=1.2, flags=0)
+    flow_ab = cv2.calcOpticalFlowFarneback(gray_a, gray_b, None, **params)
+    flow_ba = cv2.calcOpticalFlowFarneback(gray_b, gray_a, None, **params)
+
+    height, width = gray_a.shape
+    grid_x, grid_y = np.meshgrid(np.arange(width, dtype=np.float32), np.arange(height, dtype=np.float32))
+
+    # Sample A backwards along its flow and B forwards along the reverse flow
+    map_a_x = grid_x - alpha * flow_ab[..., 0]
+    map_a_y = grid_y - alpha * flow_ab[..., 1]
+    map_b_x = grid_x - (1 - alpha) * flow_ba[..., 0]
+    map_b_y = grid_y - (1 - alpha) * flow_ba[..., 1]
+    warped_a = cv2.remap(frame_a, map_a_x, map_a_y, cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+    warped_b = cv2.remap(frame_b, map_b_x, map_b_y, cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+    return cv2.addWeighted(warped_a, 1 - alpha, warped_b, alpha, 0)
+
+
+def _blend(frame_a, frame_b, alpha: float):
+    import cv2
+
+    return cv2.addWeighted(frame_a, 1 - alpha, frame_b, alpha, 0)
+
+
+def interpolate_frames(
+    frames: Iterable,
+    num_frames: int,
+    src_fps: float,
+    dst_fps: float = OUTPUT_FPS,
+    method: str = "flow",
+) -> Iterator:
+    """
+    Resample a frame stream to dst_fps
+
+    Only two source frames are held in memory at a time.
+
+    Args:
+        frames: BGR uint8 frames in order
+        num_frames: Number of frames in `frames`
+        src_fps: Frame rate of the input
+        dst_fps: Frame rate of the output
+        method: "flow" or "blend"
+
+    Yields:
+        BGR uint8 frames at dst_fps
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown interpolation method '{method}'. Expected one of: {', '.join(METHODS)}")
+    mix = _flow_interpolate if method == "flow" else _blend
+
+    source = iter(frames)
+    current_index = 0
+    current = next(source, None)
+    following = next(source, None)
+    for index, alpha in output_schedule(num_frames, src_fps, dst_fps):
+        while current_index < index:
+            current, following = following, next(source, None)
+            current_index += 1
+        if alpha < 1e-3 or following is None:
+            yield current
+        else:
+            yield mix(current, following, alpha)
+
+
+def _read_frames(path: Path) -> Tuple[Iterator, int, float]:
+    import cv2
+
+    capture = cv2.VideoCapture(str(path))
+    if not capture.isOpened():
+        raise RuntimeError(f"Could not open video {path}")
+    count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = capture.get(cv2.CAP_PROP_FPS)
+
+    def frames():
+        try:
+            while True:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                yield frame
+        finally:
+            capture.release()
+
+    return frames(), count, fps
+
+
+def interpolate_video(
+    video_bytes: bytes,
+    audio_bytes: bytes = None,
+    dst_fps: int = OUTPUT_FPS,
+    method: str = "flow",
+) -> bytes:
+    """
+    Upsample a generated MP4 to dst_fps and mux the driving audio
+
+    Args:
+        video_bytes: Low-frame-rate MP4 from the GPU stage
+        audio_bytes: Original audio (WAV/MP3); if None the video's own audio is dropped
+        dst_fps: Output frame rate
+        method: "flow" or "blend"
+
+    Returns:
+        H.264/AAC MP4 at dst_fps
+    """
+    import cv2
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmpdir_path = Path(tmpdir)
+        source_path = tmpdir_path / "source.mp4"
+        frames_path = tmpdir_path / "frames.mp4"
+        output_path = tmpdir_path / "output.mp4"
+        source_path.write_bytes(video_bytes)
+
+        frames, count, src_fps = _read_frames(source_path)
+        if count < 1 or src_fps <= 0:
+            raise RuntimeError("Generated video has no frames")
+        print(f"Interpolating {count} frames: {src_fps:.2f} fps -> {dst_fps} fps ({method})")
+
+        writer = None
+        written = 0
+        for frame in interpolate_frames(frames, count, src_fps, dst_fps, method):
+            if writer is None:
+                height, width = frame.shape[:2]
+                writer = cv2.VideoWriter(
+                    str(frames_path), cv2.VideoWriter_fourcc(*"mp4v"), dst_fps, (width, height)
+                )
+            writer.write(frame)
+            written += 1
+        if writer is not None:
+            writer.release()
+
+        cmd = ["ffmpeg", "-y", "-loglevel", "error", "-i", str(frames_path)]
+        if audio_bytes:
+            audio_path = tmpdir_path / "audio"
+            audio_path.write_bytes(audio_bytes)
+            cmd += ["-i", str(audio_path), "-map", "0:v:0", "-map", "1:a:0", "-c:a", "aac", "-shortest"]
+        cmd += ["-c:v", "libx264", "-pix_fmt", "yuv420p", "-r", str(dst_fps), str(output_path)]
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Muxing interpolated video failed: {result.stderr}")
+
+        print(f"✅ Wrote {written} frames at {dst_fps} fps")
+        return output_path.read_bytes()
@@ -0,0 +1,279 @@
+"""
+GPU memory admission control for Wan2.2 S2V
+
+`--offload_model True` keeps OOMs away but moves model components between
+CPU and GPU on every clip, which is slow. The planner estimates a request's
+peak VRAM from its resolution, frames per clip and pose conditioning plus the
+model footprint, and picks:
+- "resident": everything stays on the GPU (fast) when it fits
+- "offload": only the active component is on the GPU
+- "reject": not even offload mode fits this GPU
+
+OOM events and measured peaks are recorded so the estimates can be
+recalibrated per resolution. Pure Python; no GPU or torch needed.
+"""
+
+import math
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+RESIDENT = "resident"
+OFFLOAD = "offload"
+REJECT = "reject"
+
+PEAK_PREFIX = "PEAK_VRAM_GB "
+OOM_MARKERS = ("CUDA out of memory", "OutOfMemoryError", "CUBLAS_STATUS_ALLOC_FAILED")
+
+
+class InsufficientGPUMemory(RuntimeError):
+    """Request cannot fit on this GPU even with model offloading"""
+
+
+@dataclass
+class MemoryProfile:
+    """Footprint constants in GB (bf16 weights after --convert_model_dtype)"""
+
+    # DiT + T5 + VAE + wav2vec all on the GPU
+    resident_weights_gb: float = 44.0
+    # Largest component on the GPU at a time when offloading (the DiT)
+    offload_weights_gb: float = 30.0
+    # Activations per megapixel-frame of a clip (latents, attention, VAE decode)
+    activation_gb_per_mpx_frame: float = 0.12
+    # Fixed working memory (CUDA context, allocator slack)
+    base_gb: float = 3.0
+    # Extra activation share when a pose video is conditioned on
+    pose_factor: float = 1.15
+    # Decoded frames of finished clips kept on the GPU until concatenation
+    gb_per_finished_clip: float = 0.15
+    # Headroom kept free on the device
+    safety_margin_gb: float = 2.0
+
+
+@dataclass
+class MemoryRequest:
+    """What the planner needs to know about a generation"""
+
+    width: int
+    height: int
+    frames_per_clip: int = 80
+    num_clips: int = 1
+    has_pose: bool = False
+
+    @classmethod
+    def from_size(cls, size: str, **kwargs) -> "MemoryRequest":
+        """Build from a --size string such as "1024*704\""""
+        width, height = (int(v) for v in size.split("*"))
+        return cls(width=width, height=height, **kwargs)
+
+    @property
+    def size(self) -> str:
+        """--size string, the key calibration is kept under"""
+        return f"{self.width}*{self.height}"
+
+
+@dataclass
+class MemoryPlan:
+    mode: str
+    estimate_gb: float
+    capacity_gb: float
+    reason: str = ""
+    # Split of the estimate, kept for recalibration
+    fixed_gb: float = 0.0
+    raw_activation_gb: float = 0.0
+
+    @property
+    def offload(self) -> bool:
+        return self.mode == OFFLOAD
+
+
+@dataclass
+class MemoryEvent:
+    """One observed run, used for recalibration"""
+
+    mode: str
+    estimate_gb: float
+    capacity_gb: float
+    fixed_gb: float
+    raw_activation_gb: float
+    oom: bool = False
+    peak_gb: Optional[float] = None
+    size: str = ""
+    # Unix time of the run; 0.0 for events stored before this was recorded
+    at: float = 0.0
+
+    def factor(self) -> Optional[float]:
+        """Activation calibration that would have predicted this run, if known"""
+        if self.oom:
+            # The true peak was at least the device capacity
+            needed = self.capacity_gb * 1.05
+        elif self.peak_gb:
+            needed = self.peak_gb
+        else:
+            return None
+        if self.raw_activation_gb <= 0:
+            return None
+        return (needed - self.fixed_gb) / self.raw_activation_gb
+
+
+@dataclass
+class MemoryPlanner:
+    """
+    Estimate peak VRAM and choose resident/offload mode
+
+    Activation estimates are scaled by a calibration factor per `--size`,
+    derived by recalibrate() from the recent OOMs and measured peaks at that
+    size. Sizes without events use 1.0.
+
+    Calibration alone only rejects a request after `reject_after_ooms`
+    offload-mode OOMs at that size within `reject_ttl_s`; otherwise a request
+    the uncalibrated profile says fits is tried with offloading, so one
+    unlucky OOM cannot lock a resolution out.
+    """
+
+    profile: MemoryProfile = field(default_factory=MemoryProfile)
+    calibrations: Dict[str, float] = field(default_factory=dict)
+    events: List[MemoryEvent] = field(default_factory=list)
+    max_events: int = 200
+    # Recent events per size that calibration is drawn from
+    window: int = 20
+    # Share of those runs the calibrated estimate should cover
+    percentile: float = 0.9
+    reject_after_ooms: int = 2
+    reject_ttl_s: float = 6 * 3600
+
+    def calibration(self, size: str) -> float:
+        """Activation calibration for a --size, 1.0 when nothing was observed"""
+        return self.calibrations.get(size, 1.0)
+
+    def raw_activation_gb(self, request: MemoryRequest) -> float:
+        """Uncalibrated activation estimate for one clip"""
+        megapixels = request.width * request.height / 1e6
+        activations = self.profile.activation_gb_per_mpx_frame * megapixels * request.frames_per_clip
+        if request.has_pose:
+            activations *= self.profile.pose_factor
+        return activations
+
+    def fixed_gb(self, request: MemoryRequest, mode: str) -> float:
+        """Weights, working memory and finished clips for a mode"""
+        weights = (
+            self.profile.resident_weights_gb if mode == RESIDENT else self.profile.offload_weights_gb
+        )
+        clips = max(1, request.num_clips or 1)
+        return weights + self.profile.base_gb + self.profile.gb_per_finished_clip * (clips - 1)
+
+    def estimate_gb(self, request: MemoryRequest, mode: str, calibrated: bool = True) -> float:
+        """Peak VRAM estimate for a request in the given mode"""
+        factor = self.calibration(request.size) if calibrated else 1.0
+        return self.fixed_gb(request, mode) + self.raw_activation_gb(request) * factor
+
+    def plan_mode(self, request: MemoryRequest, mode: str, capacity_gb: float, reason: str = "") -> MemoryPlan:
+        """Plan for a specific mode, e.g. to fall back to offloading after an OOM"""
+        return MemoryPlan(
+            mode=mode,
+            estimate_gb=round(self.estimate_gb(request, OFFLOAD if mode == REJECT else mode), 2),
+            capacity_gb=capacity_gb,
+            reason=reason,
+            fixed_gb=self.fixed_gb(request, OFFLOAD if mode == REJECT else mode),
+            raw_activation_gb=self.raw_activation_gb(request),
+        )
+
+    def plan(self, request: MemoryRequest, capacity_gb: float, now: float = None) -> MemoryPlan:
+        """Pick the fastest mode whose estimate fits on the device"""
+        usable = capacity_gb - self.profile.safety_margin_gb
+        resident = self.estimate_gb(request, RESIDENT)
+        if resident <= usable:
+            return self.plan_mode(request, RESIDENT, capacity_gb, f"{resident:.1f}GB fits in {usable:.1f}GB")
+        offload = self.estimate_gb(request, OFFLOAD)
+        if offload <= usable:
+            return self.plan_mode(
+                request, OFFLOAD, capacity_gb, f"resident needs {resident:.1f}GB > {usable:.1f}GB"
+            )
+        if self.estimate_gb(request, OFFLOAD, calibrated=False) <= usable:
+            ooms = self.recent_offload_ooms(request.size, now)
+            if ooms < self.reject_after_ooms:
+                return self.plan_mode(
+                    request, OFFLOAD, capacity_gb,
+                    f"calibrated estimate {offload:.1f}GB > {usable:.1f}GB after {ooms} offload "
+                    f"OOM(s); trying offload",
+                )
+        return self.plan_mode(
+            request, REJECT, capacity_gb,
+            f"needs {offload:.1f}GB even with offloading, {usable:.1f}GB available",
+        )
+
+    def recent_offload_ooms(self, size: str, now: float = None) -> int:
+        """Offload-mode OOMs at a size within reject_ttl_s"""
+        cutoff = (time.time() if now is None else now) - self.reject_ttl_s
+        return sum(
+            1 for event in self.events
+            if event.size == size and event.mode == OFFLOAD and event.oom and event.at >= cutoff
+        )
+
+    def record(
+        self, plan: MemoryPlan, oom: bool = False, peak_gb: float = None, size: str = "", at: float = None
+    ) -> MemoryEvent:
+        """Store the outcome of a run and recalibrate"""
+        event = MemoryEvent(
+            mode=plan.mode,
+            estimate_gb=plan.estimate_gb,
+            capacity_gb=plan.capacity_gb,
+            fixed_gb=plan.fixed_gb,
+            raw_activation_gb=plan.raw_activation_gb,
+            oom=oom,
+            peak_gb=peak_gb,
+            size=size,
+            at=time.time() if at is None else at,
+        )
+        self.events = (self.events + [event])[-self.max_events:]
+        self.recalibrate()
+        return event
+
+    def recalibrate(self):
+        """
+        Derive per-size activation calibration from recorded events
+
+        Each OOM or measured peak gives the factor that would have planned
+        that run correctly. A size's calibration is the `percentile` of the
+        factors from its last `window` events, so newer runs (including
+        successes below the estimate) push an outlier out again. It never
+        drops below 1.0 so a run of small jobs cannot make the planner
+        optimistic.
+        """
+        factors: Dict[str, List[float]] = {}
+        for event in self.events:
+            factor = event.factor()
+            if factor is not None:
+                factors.setdefault(event.size, []).append(factor)
+        self.calibrations = {}
+        for size, values in factors.items():
+            recent = sorted(values[-self.window:])
+            rank = max(1, math.ceil(self.percentile * len(recent)))
+            self.calibrations[size] = max(1.0, recent[rank - 1])
+
+    def state(self) -> dict:
+        """Serialisable events for persisting between containers"""
+        return {"events": [asdict(event) for event in self.events]}
+
+    @classmethod
+    def from_state(cls, state: dict, profile: MemoryProfile = None) -> "MemoryPlanner":
+        planner = cls(profile=profile or MemoryProfile())
+        planner.events = [MemoryEvent(**event) for event in (state or {}).get("events", [])]
+        planner.recalibrate()
+        return planner
+
+
+def is_oom(output: str) -> bool:
+    """True if subprocess output shows a CUDA out-of-memory failure"""
+    return any(marker in output for marker in OOM_MARKERS)
+
+
+def parse_peak(output: str) -> Optional[float]:
+    """Peak VRAM line printed by wan2_runner.py, in GB"""
+    for line in reversed(output.splitlines()):
+        if line.startswith(PEAK_PREFIX):
+            try:
+                return float(line[len(PEAK_PREFIX):])
+            except ValueError:
+                return None
+    return None
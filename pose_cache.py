@@ -0,0 +1,168 @@
+"""
+Pose video preprocessing cache
+
+Without preprocessing, the raw pose MP4 goes straight into the GPU run. There
+it is decoded in full, resampled to the sampling frame rate and resized and
+cropped to the target size, on every request. Here a CPU stage does that once:
+
+- only the frames the render needs are decoded (ffmpeg stops at the
+  requested duration)
+- frames are resampled to the generation frame rate and scaled and
+  center-cropped to the render's output dimensions, so the pipeline's own
+  resize is a no-op. `--size` is only an area: the output shape follows the
+  reference image (compile_cache.output_dims), so the caller passes the
+  dims it computed from the image. Without them, frames keep their size
+- the result is stored as a compact MP4 in a content-addressed cache on the
+  `wan2-models` Volume, keyed by the pose video's hash, output dims and fps
+
+Pose templates and re-used choreography then cost a cache lookup. A cached
+entry that covers at least the needed duration is reused, so one long
+normalization serves every shorter render of the same template; a longer
+entry is cut down to the needed length (stream copy, no re-encode) first.
+"""
+
+import hashlib
+import json
+import math
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+CACHE_SUBDIR = "pose-cache"
+MANIFEST_NAME = "manifest.json"
+# CRF for the normalized video; pose skeletons are flat colours and stay sharp
+CRF = 12
+
+
+def cache_key(pose_bytes: bytes, fps: int, dims: Tuple[int, int] = None) -> str:
+    """Directory key for a pose video normalized to output dims and a frame rate"""
+    digest = hashlib.sha256(pose_bytes).hexdigest()[:32]
+    shape = f"{dims[0]}x{dims[1]}" if dims else "source"
+    return f"{digest}_{shape}_{fps}fps"
+
+
+def bucket_duration(duration_s: float, clip_s: float = 5.0) -> int:
+    """Needed duration rounded up to whole clips, plus one clip of margin"""
+    return int(clip_s * (math.ceil(max(duration_s, 0.0) / clip_s) + 1))
+
+
+def normalize_cmd(source: Path, output: Path, fps: int, duration_s: float, dims: Tuple[int, int] = None) -> list:
+    """ffmpeg command decoding `duration_s` of source at `fps`, scaled and cropped to `dims` if given"""
+    video_filter = f"fps={fps}"
+    if dims:
+        width, height = dims
+        video_filter += (
+            f",scale={width}:{height}:force_original_aspect_ratio=increase,"
+            f"crop={width}:{height}"
+        )
+    return [
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-i", str(source),
+        "-t", f"{duration_s:.3f}",
+        "-vf", video_filter,
+        "-an", "-c:v", "libx264", "-crf", str(CRF), "-pix_fmt", "yuv420p",
+        str(output),
+    ]
+
+
+def trim_cmd(source: Path, output: Path, duration_s: float) -> list:
+    """ffmpeg command keeping the first `duration_s` of a normalized video without re-encoding"""
+    return [
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-i", str(source), "-t", f"{duration_s:.3f}", "-an", "-c:v", "copy",
+        str(output),
+    ]
+
+
+def _run(cmd: list, what: str):
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{what} failed: {result.stderr}")
+
+
+class PoseCache:
+    """Normalized pose videos on a Volume, one directory per cache key"""
+
+    def __init__(self, root: str):
+        self.root = Path(root) / CACHE_SUBDIR
+
+    def lookup(self, key: str, duration_s: float) -> Optional[Tuple[int, Path]]:
+        """(covered seconds, path) of the shortest cached normalization covering duration_s"""
+        directory = self.root / key
+        if not directory.exists():
+            return None
+        candidates = []
+        for path in directory.glob("*s.mp4"):
+            try:
+                covered = int(path.name[:-len("s.mp4")])
+            except ValueError:
+                continue
+            if covered >= duration_s:
+                candidates.append((covered, path))
+        return min(candidates) if candidates else None
+
+    def normalize(
+        self,
+        pose_bytes: bytes,
+        fps: int,
+        duration_s: float,
+        clip_s: float = 5.0,
+        dims: Tuple[int, int] = None,
+    ) -> tuple:
+        """
+        Return a normalized pose video, preprocessing it on a cache miss
+
+        Args:
+            pose_bytes: Raw pose video (MP4)
+            fps: Frame rate the pipeline samples at
+            duration_s: Length of the render the pose drives
+            clip_s: Clip length used to bucket durations
+            dims: Output (width, height) of the render; None keeps the
+                source frame size
+
+        Returns:
+            (normalized MP4 bytes, True if served from cache)
+        """
+        key = cache_key(pose_bytes, fps, dims)
+        covered = bucket_duration(duration_s, clip_s)
+        cached = self.lookup(key, duration_s)
+        if cached is not None:
+            cached_s, path = cached
+            if cached_s <= covered:
+                return path.read_bytes(), True
+            # A long template serving a short render: hand over only what it needs
+            with tempfile.TemporaryDirectory() as tmpdir:
+                trimmed = Path(tmpdir) / "pose_trimmed.mp4"
+                _run(trim_cmd(path, trimmed, covered), "Trimming cached pose video")
+                return trimmed.read_bytes(), True
+
+        directory = self.root / key
+        directory.mkdir(parents=True, exist_ok=True)
+        target = directory / f"{covered}s.mp4"
+        with tempfile.TemporaryDirectory() as tmpdir:
+            source = Path(tmpdir) / "pose_source.mp4"
+            partial = Path(tmpdir) / "pose_normalized.mp4"
+            source.write_bytes(pose_bytes)
+            started = time.time()
+            _run(normalize_cmd(source, partial, fps, covered, dims), "Pose video preprocessing")
+            data = partial.read_bytes()
+
+        staged = target.with_name(target.name + ".part")
+        staged.write_bytes(data)
+        staged.replace(target)
+        (directory / MANIFEST_NAME).write_text(
+            json.dumps(
+                {
+                    "key": key,
+                    "dims": list(dims) if dims else None,
+                    "fps": fps,
+                    "source_bytes": len(pose_bytes),
+                    "updated_at": time.time(),
+                    "preprocess_s": round(time.time() - started, 2),
+                },
+                indent=2,
+            )
+        )
+        return data, False
@@ -0,0 +1,347 @@
+"""
+GPU request scheduler for Wan2.2 S2V
+
+Sits between the FastAPI endpoint and Wan2S2VModel so that short interactive
+previews do not wait behind long batch renders.
+
+Ordering rules:
+- Every job belongs to a priority class (interactive, standard, batch)
+- Jobs age while they wait, so batch work is never starved forever
+- Optionally, shorter estimated jobs go first within the same effective tier
+
+The scheduler itself is plain Python with an injectable clock so it can be
+driven by a simulated clock and stub workers. GPUDispatcher wraps it with
+asyncio for use inside the web container.
+"""
+
+import asyncio
+import io
+import itertools
+import time
+import wave
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+# Priority classes, best first
+PRIORITY_CLASSES = ("interactive", "standard", "batch")
+DEFAULT_PRIORITY = "standard"
+
+# Head start of each class in seconds of effective waiting time. With the
+# default aging rate of 0.5, a standard job ties a new interactive one after
+# waiting an hour and a batch job after three. Tuned with simulate_scheduler.py:
+# at 85% load, smaller offsets or faster aging let aged standard jobs overtake
+# interactive ones and priority ordering did worse than FIFO.
+PRIORITY_OFFSETS_S = {
+    "interactive": 0.0,
+    "standard": 1800.0,
+    "batch": 5400.0,
+}
+
+# Rough GPU seconds per second of output audio on one A100-80GB
+SECONDS_PER_AUDIO_SECOND = {
+    "480p": 40.0,
+    "720p": 120.0,
+}
+# Wan2.2 S2V renders a fixed number of frames per clip (--infer_frames) at the
+# pipeline's sample rate, so a clip covers FRAMES_PER_CLIP / fps seconds of audio.
+# Rendering at a lower generation_fps makes every clip longer.
+FRAMES_PER_CLIP = 80
+MODEL_FPS = 16  # s2v-14B sample_fps when generation_fps is not set
+MIN_ESTIMATE_S = 60.0
+
+
+def clip_seconds(generation_fps: int = None) -> float:
+    """Audio covered by one generated clip at a generation frame rate"""
+    return FRAMES_PER_CLIP / float(generation_fps or MODEL_FPS)
+
+
+CLIP_SECONDS = clip_seconds()  # 5.0 s at the model's own frame rate
+
+
+def audio_duration_s(audio_bytes: bytes) -> float:
+    """
+    Cheap audio duration estimate without decoding
+
+    WAV headers are parsed exactly; anything else (MP3/AAC) is assumed to be
+    a ~128 kbps stream.
+    """
+    try:
+        with wave.open(io.BytesIO(audio_bytes)) as wav:
+            return wav.getnframes() / float(wav.getframerate())
+    except (wave.Error, EOFError):
+        return len(audio_bytes) / 16000.0
+
+
+def estimate_duration_s(
+    resolution: str = "720p",
+    audio_seconds: float = None,
+    num_clips: int = None,
+    has_pose: bool = False,
+    generation_fps: int = None,
+) -> float:
+    """
+    Estimate GPU time for a request in seconds
+
+    GPU time follows the number of clips, since every clip is FRAMES_PER_CLIP
+    frames. At a lower generation_fps each clip covers more audio, so the
+    same track needs fewer clips.
+
+    Args:
+        resolution: "480p" or "720p"
+        audio_seconds: Length of the driving audio, if known
+        num_clips: Explicit clip count; overrides the audio length
+        has_pose: Pose-driven runs are somewhat slower
+        generation_fps: Reduced render frame rate, if any
+
+    Returns:
+        Estimated generation time in seconds
+    """
+    rate = SECONDS_PER_AUDIO_SECOND.get(resolution, SECONDS_PER_AUDIO_SECOND["720p"])
+    if num_clips:
+        clips = num_clips
+    elif audio_seconds:
+        clips = audio_seconds / clip_seconds(generation_fps)
+    else:
+        clips = 1
+    # SECONDS_PER_AUDIO_SECOND is measured at the model's own frame rate
+    estimate = clips * CLIP_SECONDS * rate
+    if has_pose:
+        estimate *= 1.2
+    return max(estimate, MIN_ESTIMATE_S)
+
+
+@dataclass
+class Job:
+    """A request waiting for a GPU slot"""
+
+    job_id: str
+    priority: str = DEFAULT_PRIORITY
+    estimated_s: float = MIN_ESTIMATE_S
+    enqueued_at: float = 0.0
+    seq: int = 0
+
+
+@dataclass
+class SchedulerConfig:
+    """Tunables for PriorityScheduler"""
+
+    # Seconds of effective priority gained per second of waiting
+    aging_rate: float = 0.5
+    # Weight of estimated duration in the ordering (0 disables SJF)
+    duration_weight: float = 0.0
+    offsets_s: Dict[str, float] = field(default_factory=lambda: dict(PRIORITY_OFFSETS_S))
+
+
+class PriorityScheduler:
+    """
+    Priority queue with aging and optional shortest-job-first ordering
+
+    The effective score of a waiting job is
+
+        offset(priority) + duration_weight * estimated_s - aging_rate * waited_s
+
+    and the job with the lowest score runs next (ties go to arrival order).
+    Scores change as time passes, so they are recomputed on every decision;
+    queues here are at most a few hundred entries.
+    """
+
+    def __init__(self, config: SchedulerConfig = None, clock: Callable[[], float] = time.monotonic):
+        self.config = config or SchedulerConfig()
+        self.clock = clock
+        self._jobs: Dict[str, Job] = {}
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def __contains__(self, job_id: str):
+        return job_id in self._jobs
+
+    def push(self, job_id: str, priority: str = DEFAULT_PRIORITY, estimated_s: float = MIN_ESTIMATE_S) -> Job:
+        """Add a job to the queue"""
+        if priority not in self.config.offsets_s:
+            raise ValueError(
+                f"Unknown priority '{priority}'. Expected one of: {', '.join(PRIORITY_CLASSES)}"
+            )
+        if job_id in self._jobs:
+            raise ValueError(f"Job '{job_id}' is already queued")
+        job = Job(
+            job_id=job_id,
+            priority=priority,
+            estimated_s=estimated_s,
+            enqueued_at=self.clock(),
+            seq=next(self._seq),
+        )
+        self._jobs[job_id] = job
+        return job
+
+    def remove(self, job_id: str) -> Optional[Job]:
+        """Drop a job from the queue (e.g. client went away)"""
+        return self._jobs.pop(job_id, None)
+
+    def score(self, job: Job, now: float = None) -> float:
+        """Effective score of a job; lower runs first"""
+        now = self.clock() if now is None else now
+        waited = max(0.0, now - job.enqueued_at)
+        return (
+            self.config.offsets_s[job.priority]
+            + self.config.duration_weight * job.estimated_s
+            - self.config.aging_rate * waited
+        )
+
+    def ordered(self) -> List[Job]:
+        """Waiting jobs in the order they would be dispatched right now"""
+        now = self.clock()
+        return sorted(self._jobs.values(), key=lambda job: (self.score(job, now), job.seq))
+
+    def peek(self) -> Optional[Job]:
+        """Job that would run next, without removing it"""
+        jobs = self.ordered()
+        return jobs[0] if jobs else None
+
+    def pop(self) -> Optional[Job]:
+        """Remove and return the job that should run next"""
+        job = self.peek()
+        if job is not None:
+            del self._jobs[job.job_id]
+        return job
+
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based queue position of a job, or None if not waiting"""
+        for index, job in enumerate(self.ordered(), start=1):
+            if job.job_id == job_id:
+                return index
+        return None
+
+    def snapshot(self) -> List[dict]:
+        """Queue contents for status endpoints"""
+        now = self.clock()
+        return [
+            {
+                "job_id": job.job_id,
+                "position": index,
+                "priority": job.priority,
+                "estimated_seconds": round(job.estimated_s, 1),
+                "waited_seconds": round(now - job.enqueued_at, 1),
+            }
+            for index, job in enumerate(self.ordered(), start=1)
+        ]
+
+
+def reserved_slots(reservation: Optional[dict], now: float = None) -> int:
+    """
+    GPU slots held by an out-of-band batch run
+
+    Args:
+        reservation: {"slots": n, "expires_at": t} as written by the batch
+            entrypoint, or None
+        now: Current wall-clock time
+
+    Returns:
+        The reserved slot count, 0 if there is none or it has expired (the
+        batch run refreshes it while it is alive)
+    """
+    if not reservation:
+        return 0
+    now = time.time() if now is None else now
+    if reservation.get("expires_at", 0.0) <= now:
+        return 0
+    return max(0, int(reservation.get("slots", 0)))
+
+
+class GPUDispatcher:
+    """
+    Async gate limiting concurrent GPU calls to a fixed number of slots
+
+    Usage:
+        async with dispatcher.slot(job_id, priority="interactive", estimated_s=90):
+            video = await model.generate.remote.aio(...)
+
+    Waiting requests are released in PriorityScheduler order. If the awaiting
+    task is cancelled (client disconnect), its job is removed from the queue.
+    """
+
+    def __init__(self, capacity: int, scheduler: PriorityScheduler = None):
+        if capacity < 1:
+            raise ValueError("Dispatcher capacity must be at least 1")
+        self.capacity = capacity
+        # An empty scheduler is falsy (__len__), so test for None explicitly
+        self.scheduler = scheduler if scheduler is not None else PriorityScheduler()
+        self.running: Dict[str, Job] = {}
+        self._waiters: Dict[str, asyncio.Future] = {}
+
+    def _dispatch(self):
+        """Grant free slots to the best waiting jobs"""
+        while len(self.running) < self.capacity and len(self.scheduler):
+            job = self.scheduler.pop()
+            self.running[job.job_id] = job
+            waiter = self._waiters.pop(job.job_id)
+            if not waiter.done():
+                waiter.set_result(job)
+
+    async def acquire(self, job_id: str, priority: str = DEFAULT_PRIORITY, estimated_s: float = MIN_ESTIMATE_S) -> Job:
+        """Wait until the job is granted a GPU slot"""
+        if job_id in self.running:
+            raise ValueError(f"Job '{job_id}' is already running")
+        self.scheduler.push(job_id, priority=priority, estimated_s=estimated_s)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[job_id] = waiter
+        self._dispatch()
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            if self.scheduler.remove(job_id) is None:
+                # Slot was granted just as we were cancelled; give it back
+                self.release(job_id)
+            self._waiters.pop(job_id, None)
+            raise
+
+    def release(self, job_id: str):
+        """Free the slot held by a job and wake the next one"""
+        self.running.pop(job_id, None)
+        self._dispatch()
+
+    def slot(self, job_id: str, priority: str = DEFAULT_PRIORITY, estimated_s: float = MIN_ESTIMATE_S):
+        """Async context manager around acquire()/release()"""
+        return _Slot(self, job_id, priority, estimated_s)
+
+    def set_capacity(self, capacity: int):
+        """
+        Change the number of slots, e.g. when GPUs are lent to a batch run
+
+        Jobs already running above a reduced capacity finish normally; no new
+        job starts until the count drops below it.
+        """
+        if capacity < 1:
+            raise ValueError("Dispatcher capacity must be at least 1")
+        self.capacity = capacity
+        self._dispatch()
+
+    def position(self, job_id: str) -> Optional[int]:
+        """0 if running, 1-based queue position if waiting, None if unknown"""
+        if job_id in self.running:
+            return 0
+        return self.scheduler.position(job_id)
+
+    def status(self) -> dict:
+        """Summary of running and waiting jobs"""
+        return {
+            "capacity": self.capacity,
+            "running": list(self.running),
+            "waiting": self.scheduler.snapshot(),
+        }
+
+
+class _Slot:
+    def __init__(self, dispatcher: GPUDispatcher, job_id: str, priority: str, estimated_s: float):
+        self.dispatcher = dispatcher
+        self.job_id = job_id
+        self.priority = priority
+        self.estimated_s = estimated_s
+
+    async def __aenter__(self):
+        return await self.dispatcher.acquire(self.job_id, self.priority, self.estimated_s)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.dispatcher.release(self.job_id)
+        return False
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Offline evaluation of warm pool policies for Wan2S2VModel
+
+Replays a recorded request trace against a simple model of Modal's
+autoscaler and reports queueing delay and GPU cost for:
+- baseline: scale from zero on demand (current deployment)
+- predictive: WarmPoolController from autoscaler.py
+
+Trace format (JSONL, one request per line):
+    {"t": 1723456789.0, "duration_s": 840}
+
+`t` is a Unix timestamp (or seconds from trace start); `duration_s` is the
+GPU time the request took.
+
+Usage:
+    python simulate_warm_pool.py trace.jsonl
+    python simulate_warm_pool.py --synthetic 200      # Generated day of traffic
+"""
+
+import argparse
+import json
+import random
+import sys
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from autoscaler import MetricsWindow, PeakWindow, WarmPoolController, WarmPoolPolicy
+
+A100_80GB_PER_HOUR = 4.00  # USD, see README cost estimates
+
+
+@dataclass
+class Container:
+    ready_at: float
+    busy_until: float = 0.0
+    idle_since: float = 0.0
+
+    def state(self, now: float) -> str:
+        if now < self.ready_at:
+            return "starting"
+        if now < self.busy_until:
+            return "busy"
+        return "idle"
+
+
+@dataclass
+class SimResult:
+    name: str
+    waits: List[float] = field(default_factory=list)
+    container_seconds: float = 0.0
+    cold_starts: int = 0
+
+    def summary(self) -> dict:
+        waits = sorted(self.waits)
+        p95 = waits[min(len(waits) - 1, int(0.95 * len(waits)))] if waits else 0.0
+        return {
+            "policy": self.name,
+            "requests": len(waits),
+            "mean_wait_s": round(sum(waits) / len(waits), 1) if waits else 0.0,
+            "p95_wait_s": round(p95, 1),
+            "cold_starts": self.cold_starts,
+            "gpu_hours": round(self.container_seconds / 3600, 2),
+            "cost_usd": round(self.container_seconds / 3600 * A100_80GB_PER_HOUR, 2),
+        }
+
+
+def load_trace(path: str) -> List[dict]:
+    """Read a JSONL trace sorted by arrival time"""
+    with open(path) as f:
+        trace = [json.loads(line) for line in f if line.strip()]
+    return sorted(trace, key=lambda r: r["t"])
+
+
+def synthetic_trace(count: int, seed: int = 0) -> List[dict]:
+    """One day of traffic with an afternoon peak"""
+    rng = random.Random(seed)
+    trace = []
+    for _ in range(count):
+        if rng.random() < 0.6:
+            t = rng.uniform(14, 18) * 3600
+        else:
+            t = rng.uniform(0, 24) * 3600
+        duration = rng.choice([180, 300, 900, 1200])
+        trace.append({"t": t, "duration_s": duration})
+    return sorted(trace, key=lambda r: r["t"])
+
+
+def peak_demand(trace: List[dict], window_s: float = 3600.0) -> float:
+    """Busiest hour's GPU work in containers (sum of durations / window)"""
+    busiest = 0.0
+    start = 0
+    total = 0.0
+    for end, request in enumerate(trace):
+        total += request["duration_s"]
+        while request["t"] - trace[start]["t"] > window_s:
+            total -= trace[start]["duration_s"]
+            start += 1
+        busiest = max(busiest, total / window_s)
+    return busiest
+
+
+def simulate(
+    trace: List[dict],
+    controller: Optional[WarmPoolController],
+    name: str,
+    cold_start_s: float = 180.0,
+    scaledown_window_s: float = 600.0,
+    max_containers: int = 4,
+    tick_s: float = 5.0,
+    controller_interval_s: float = 60.0,
+) -> SimResult:
+    """
+    Replay a trace against a tick-based model of the Modal autoscaler
+
+    Each container serves one input at a time. The autoscaler keeps
+    max(min_containers, demand + buffer_containers) containers, starts new
+    ones with a fixed cold-start delay and stops containers idle for longer
+    than the scaledown window.
+    """
+    result = SimResult(name=name)
+    if not trace:
+        return result
+
+    start = trace[0]["t"]
+    end = trace[-1]["t"] + max(r["duration_s"] for r in trace) + scaledown_window_s
+    now = start
+    metrics = MetricsWindow(clock=lambda: now)
+    containers: List[Container] = []
+    queue: List[dict] = []
+    pending = list(trace)
+    min_containers = buffer_containers = 0
+    next_control = start
+
+    while now <= end or queue:
+        while pending and pending[0]["t"] <= now:
+            request = pending.pop(0)
+            queue.append(request)
+            metrics.record_arrival()
+
+        # Assign queued requests to idle containers in arrival order
+        for container in containers:
+            if not queue:
+                break
+            if container.state(now) == "idle":
+                request = queue.pop(0)
+                result.waits.append(now - request["t"])
+                container.busy_until = now + request["duration_s"]
+                metrics.record_job(request["duration_s"])
+
+        busy = sum(1 for c in containers if c.state(now) == "busy")
+
+        if controller is not None and now >= next_control:
+            decision = controller.decide(metrics.observation(queue_depth=len(queue), running=busy))
+            min_containers, buffer_containers = decision.min_containers, decision.buffer_containers
+            next_control = now + controller_interval_s
+
+        # Scale up
+        target = min(max_containers, max(min_containers, busy + len(queue) + buffer_containers))
+        while len(containers) < target:
+            containers.append(Container(ready_at=now + cold_start_s))
+            metrics.record_cold_start(cold_start_s)
+            result.cold_starts += 1
+
+        # Scale down idle containers past the scaledown window
+        for container in list(containers):
+            if container.state(now) != "idle":
+                container.idle_since = now
+            elif now - container.idle_since >= scaledown_window_s and len(containers) > target:
+                containers.remove(container)
+
+        result.container_seconds += len(containers) * tick_s
+        now += tick_s
+        if not pending and not queue and not containers:
+            break
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a request trace against warm pool policies")
+    parser.add_argument("trace", nargs="?", help="JSONL trace file")
+    parser.add_argument("--synthetic", type=int, help="Generate N synthetic requests instead of a trace")
+    parser.add_argument("--cold-start", type=float, default=180.0, help="Cold start duration (s)")
+    parser.add_argument("--scaledown-window", type=float, default=600.0, help="Idle timeout (s)")
+    parser.add_argument("--max-containers", type=int, default=4, help="GPU container limit")
+    parser.add_argument("--peak", action="append", default=[], metavar="START-END:MIN",
+                        help="Peak window override in UTC hours, e.g. 14-18:2")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        trace = synthetic_trace(args.synthetic)
+    elif args.trace:
+        trace = load_trace(args.trace)
+    else:
+        parser.error("Provide a trace file or --synthetic N")
+
+    peaks = []
+    for spec in args.peak:
+        hours, _, minimum = spec.partition(":")
+        start_hour, _, end_hour = hours.partition("-")
+        peaks.append(PeakWindow(int(start_hour), int(end_hour), min_containers=int(minimum or 1)))
+
+    common = dict(
+        cold_start_s=args.cold_start,
+        scaledown_window_s=args.scaledown_window,
+        max_containers=args.max_containers,
+    )
+    results = [
+        simulate(trace, None, "baseline", **common),
+        simulate(trace, WarmPoolController(WarmPoolPolicy(peak_windows=peaks)), "predictive", **common),
+    ]
+
+    print("=" * 70)
+    print(f"Warm pool simulation: {len(trace)} requests")
+    print("=" * 70)
+    for result in results:
+        print(json.dumps(result.summary()))
+    demand = peak_demand(trace)
+    if demand > args.max_containers:
+        print(
+            f"⚠️  Busiest hour needs ~{demand:.1f} containers (limit {args.max_containers}): "
+            "waits are capacity-bound there and no warm pool policy can shorten them; "
+            "compare policies on unsaturated traffic or raise --max-containers"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
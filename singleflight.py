@@ -0,0 +1,206 @@
+"""
+Coalescing of identical in-flight generation requests (single-flight)
+
+Clients retry after HTTP timeouts while the first render is still running.
+Instead of starting another full GPU render of the same inputs, later
+identical requests attach to the running generation and receive its result.
+
+Requests are identified by request_key(), a hash of the input files and
+generation parameters. A registry maps keys to the running call:
+- LocalRegistry: in-process stand-in (tests, single container)
+- ModalDictRegistry: shared across web containers through a modal.Dict
+
+Within one process, followers await the leader's task directly; across
+processes they wait for the leader to publish a call ID and attach to it.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+PENDING = "pending"
+
+
+def request_key(files: Dict[str, Optional[bytes]], params: Dict[str, Any]) -> str:
+    """
+    Stable hash of a generation request
+
+    Args:
+        files: Input name -> bytes (None for absent optional inputs)
+        params: Generation parameters that affect the output
+
+    Returns:
+        Hex digest identifying the request
+    """
+    digest = hashlib.sha256()
+    for name in sorted(files):
+        data = files[name]
+        file_hash = hashlib.sha256(data).hexdigest() if data is not None else "-"
+        digest.update(f"{name}={file_hash};".encode())
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+class LocalRegistry:
+    """In-memory registry for a single process"""
+
+    def __init__(self):
+        self._records: Dict[str, dict] = {}
+
+    async def claim(self, key: str, record: dict) -> bool:
+        """Store record only if key is free; True if this caller now owns it"""
+        if key in self._records:
+            return False
+        self._records[key] = record
+        return True
+
+    async def get(self, key: str) -> Optional[dict]:
+        return self._records.get(key)
+
+    async def put(self, key: str, record: dict):
+        self._records[key] = record
+
+    async def delete(self, key: str):
+        self._records.pop(key, None)
+
+
+class ModalDictRegistry:
+    """Registry shared by all containers through a modal.Dict"""
+
+    def __init__(self, store):
+        self.store = store
+
+    async def claim(self, key: str, record: dict) -> bool:
+        created = await self.store.put.aio(key, record, skip_if_exists=True)
+        # Older clients return None; confirm ownership by reading back
+        if created is None:
+            current = await self.store.get.aio(key)
+            return bool(current) and current.get("owner") == record.get("owner")
+        return bool(created)
+
+    async def get(self, key: str) -> Optional[dict]:
+        return await self.store.get.aio(key)
+
+    async def put(self, key: str, record: dict):
+        await self.store.put.aio(key, record)
+
+    async def delete(self, key: str):
+        await self.store.pop.aio(key, None)
+
+
+class _Flight:
+    """A generation led by this process and the requests waiting on it"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Run one generation per request key and share its result
+
+    The leader's work runs in its own task, so every request (including the
+    one that started it) is just a waiter. When the last local waiter goes
+    away (client disconnect, DELETE), the work is cancelled.
+
+    Args:
+        registry: LocalRegistry, ModalDictRegistry or compatible object
+        attach: Coroutine function call_id -> result, used by followers in
+            other processes (e.g. FunctionCall.from_id(call_id).get.aio)
+        ttl_s: Records older than this are treated as abandoned
+        poll_interval_s: How often remote followers check for a call ID
+    """
+
+    def __init__(
+        self,
+        registry,
+        attach: Callable[[str], Awaitable[Any]],
+        ttl_s: float = 2400.0,
+        poll_interval_s: float = 2.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.registry = registry
+        self.attach = attach
+        self.ttl_s = ttl_s
+        self.poll_interval_s = poll_interval_s
+        self.clock = clock
+        self.owner = uuid.uuid4().hex
+        self._flights: Dict[str, _Flight] = {}
+
+    def _stale(self, record: dict) -> bool:
+        return self.clock() - record.get("started_at", 0) > self.ttl_s
+
+    def waiters(self, key: str) -> int:
+        """Local requests currently waiting on the generation for `key`"""
+        flight = self._flights.get(key)
+        return flight.waiters if flight else 0
+
+    async def run(
+        self,
+        key: str,
+        leader: Callable[[Callable[[str], Awaitable[None]]], Awaitable[Any]],
+    ) -> Tuple[Any, bool]:
+        """
+        Lead or follow the generation for `key`
+
+        `leader(publish)` performs the work and should await publish(call_id)
+        as soon as the remote call exists, so other processes can attach.
+        It is cancelled if every local waiter is cancelled.
+
+        Returns:
+            (result, coalesced) where coalesced is True for followers
+        """
+        if key in self._flights:
+            return await self._wait(self._flights[key]), True
+
+        record = {"owner": self.owner, "call_id": PENDING, "started_at": self.clock()}
+        if not await self.registry.claim(key, record):
+            existing = await self.registry.get(key)
+            if existing is None or self._stale(existing):
+                await self.registry.delete(key)
+                if not await self.registry.claim(key, record):
+                    return await self._follow_remote(key), True
+            else:
+                return await self._follow_remote(key), True
+
+        # Another local request may have claimed the key while we awaited
+        if key in self._flights:
+            return await self._wait(self._flights[key]), True
+
+        flight = _Flight(asyncio.create_task(self._lead(key, record, leader)))
+        self._flights[key] = flight
+        return await self._wait(flight), False
+
+    async def _lead(self, key: str, record: dict, leader):
+        async def publish(call_id: str):
+            await self.registry.put(key, {**record, "call_id": call_id})
+
+        try:
+            return await leader(publish)
+        finally:
+            self._flights.pop(key, None)
+            current = await self.registry.get(key)
+            if current is not None and current.get("owner") == self.owner:
+                await self.registry.delete(key)
+
+    async def _wait(self, flight: _Flight):
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    async def _follow_remote(self, key: str):
+        while True:
+            record = await self.registry.get(key)
+            if record is None or self._stale(record):
+                raise RuntimeError("The generation this request was attached to is no longer running")
+            if record.get("call_id") != PENDING:
+                return await self.attach(record["call_id"])
+            await asyncio.sleep(self.poll_interval_s)
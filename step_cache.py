@@ -0,0 +1,196 @@
+"""
+Denoising step cache for the Wan2.2 S2V DiT
+
+Adjacent diffusion timesteps produce very similar transformer outputs. In the
+style of TeaCache, StepCache tracks how much the model input changes between
+steps and, while the accumulated relative change stays under a threshold,
+reuses the previous step's output instead of running the 14B forward pass.
+
+Calls that share a timestep (the conditional and unconditional passes of
+classifier-free guidance) are treated as branches of one step: the skip
+decision is made on the first branch and applied to all of them, and each
+branch reuses its own cached output. A timestep that goes back up marks the
+start of a new clip and resets the cache.
+
+Works with anything that supports `(a - b).abs().mean()` (torch tensors,
+numpy arrays); no torch import at module level.
+"""
+
+import json
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+STATS_PREFIX = "STEP_CACHE_STATS "
+
+
+def _as_list(x) -> list:
+    return list(x) if isinstance(x, (list, tuple)) else [x]
+
+
+def relative_l1(previous, current) -> float:
+    """Mean |current - previous| relative to mean |previous| (lists are summed)"""
+    numerator = 0.0
+    denominator = 0.0
+    for prev, cur in zip(_as_list(previous), _as_list(current)):
+        numerator += float((cur - prev).abs().mean())
+        denominator += float(prev.abs().mean())
+    return numerator / max(denominator, 1e-8)
+
+
+def _timestep_value(t) -> float:
+    try:
+        return float(t.flatten()[0])
+    except AttributeError:
+        return float(_as_list(t)[0])
+
+
+def _detach(x):
+    if isinstance(x, (list, tuple)):
+        return type(x)(_detach(item) for item in x)
+    clone = getattr(x, "clone", None) or getattr(x, "copy", None)
+    return clone() if clone else x
+
+
+@dataclass
+class StepCacheStats:
+    """Counters for one generation"""
+
+    steps: int = 0
+    computed: int = 0
+    skipped: int = 0
+    resets: int = 0
+    distances: List[float] = field(default_factory=list)
+
+    @property
+    def skip_rate(self) -> float:
+        return self.skipped / self.steps if self.steps else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "steps": self.steps,
+            "computed": self.computed,
+            "skipped": self.skipped,
+            "skip_rate": round(self.skip_rate, 3),
+            "clips": self.resets,
+        }
+
+
+class StepCache:
+    """
+    Reuse model outputs across denoising steps while the input barely moves
+
+    Args:
+        threshold: Accumulated relative L1 change of the input that forces
+            a real forward pass. 0 disables skipping; ~0.05-0.15 is typical.
+        warmup_steps: Always compute the first N steps of every clip
+        max_consecutive_skips: Upper bound on reuse in a row, limits drift
+        distance: Function (previous_input, current_input) -> float
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.1,
+        warmup_steps: int = 2,
+        max_consecutive_skips: int = 3,
+        distance: Callable[[Any, Any], float] = relative_l1,
+    ):
+        self.threshold = threshold
+        self.warmup_steps = warmup_steps
+        self.max_consecutive_skips = max_consecutive_skips
+        self.distance = distance
+        self.stats = StepCacheStats()
+        self.reset()
+
+    def reset(self):
+        """Forget cached outputs (start of a new clip)"""
+        self._step_t: Optional[float] = None
+        self._branch = 0
+        self._skip_step = False
+        self._previous_input = None
+        self._accumulated = 0.0
+        self._consecutive = 0
+        self._clip_steps = 0
+        self._outputs: Dict[int, Any] = {}
+
+    def _begin_step(self, t: float, x):
+        if self._step_t is not None and t > self._step_t:
+            self.reset()
+        if self._clip_steps == 0:
+            self.stats.resets += 1
+        self._step_t = t
+        self._branch = 0
+        self.stats.steps += 1
+        self._clip_steps += 1
+
+        skip = False
+        if self._previous_input is not None and self.threshold > 0:
+            change = self.distance(self._previous_input, x)
+            self.stats.distances.append(change)
+            self._accumulated += change
+            skip = (
+                self._clip_steps > self.warmup_steps
+                and self._accumulated < self.threshold
+                and self._consecutive < self.max_consecutive_skips
+            )
+        self._previous_input = _detach(x)
+
+        if skip:
+            self._consecutive += 1
+            self.stats.skipped += 1
+        else:
+            self._accumulated = 0.0
+            self._consecutive = 0
+            self.stats.computed += 1
+        self._skip_step = skip
+
+    def __call__(self, forward: Callable, x, t, *args, **kwargs):
+        """Run forward(x, t, ...) or return the cached output for this branch"""
+        t_value = _timestep_value(t)
+        if t_value != self._step_t:
+            self._begin_step(t_value, x)
+        else:
+            self._branch += 1
+
+        branch = self._branch
+        if self._skip_step and branch in self._outputs:
+            return self._outputs[branch]
+        output = forward(x, t, *args, **kwargs)
+        self._outputs[branch] = output
+        return output
+
+    def report(self) -> str:
+        """One-line machine-readable summary for the parent process"""
+        return STATS_PREFIX + json.dumps({"threshold": self.threshold, **self.stats.as_dict()})
+
+
+class CachedModule:
+    """
+    Proxy around the DiT that routes calls through a StepCache
+
+    Attribute access (to(), parameters(), config, ...) goes to the wrapped
+    module, so the pipeline can keep offloading and inspecting it.
+    """
+
+    def __init__(self, module, cache: StepCache):
+        self.__dict__["_module"] = module
+        self.__dict__["_cache"] = cache
+
+    def __call__(self, x, t, *args, **kwargs):
+        return self._cache(self._module, x, t, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._module, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._module, name, value)
+
+
+def parse_report(output: str) -> Optional[dict]:
+    """Find the StepCache summary line in subprocess output"""
+    for line in reversed(output.splitlines()):
+        if line.startswith(STATS_PREFIX):
+            try:
+                return json.loads(line[len(STATS_PREFIX):])
+            except ValueError:
+                return None
+    return None
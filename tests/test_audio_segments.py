@@ -0,0 +1,77 @@
+"""Tests for the pure-Python parts of audio_segments"""
+
+import random
+
+import pytest
+
+from audio_segments import (
+    SILENCE, SPEECH, FrameBuffer, Segment, SegmentPlan, frame_sources, plan_segments,
+)
+
+
+def _random_plan(seed: int):
+    rng = random.Random(seed)
+    duration_s = rng.uniform(10, 120)
+    segments, cursor = [], 0.0
+    kind = rng.choice((SPEECH, SILENCE))
+    while cursor < duration_s:
+        end = min(duration_s, cursor + rng.uniform(0.3, 8))
+        segments.append(Segment(cursor, end, kind))
+        cursor, kind = end, SILENCE if kind == SPEECH else SPEECH
+    return plan_segments(segments, duration_s), rng
+
+
+def _buffer(frame_count: int, loop: int) -> FrameBuffer:
+    frames = iter(range(frame_count))
+    return FrameBuffer(lambda: next(frames, None), head=loop, tail=loop + 1)
+
+
+@pytest.mark.parametrize("fps", [12, 16, 24])
+@pytest.mark.parametrize("seed", range(20))
+def test_expansion_streams_within_buffer(seed, fps):
+    plan, rng = _random_plan(seed)
+    loop = max(1, round(0.5 * fps))
+    # Renders can be a few frames shorter or longer than planned
+    frame_count = max(1, round(plan.compact_s * fps) + rng.randint(-3, 3))
+    frames = _buffer(frame_count, loop)
+    for index in frame_sources(plan, fps, loop_s=0.5):
+        assert frames.get(index) == min(index, frames.count - 1)
+
+
+def test_sources_cover_original_timeline():
+    plan = plan_segments(
+        [Segment(0, 3, SILENCE), Segment(3, 8, SPEECH), Segment(8, 14, SILENCE), Segment(14, 20, SPEECH)],
+        20.0,
+    )
+    sources = frame_sources(plan, 24)
+    assert len(sources) == 480
+    assert max(sources) < round(plan.compact_s * 24)
+
+
+@pytest.mark.parametrize("fps", [12, 16, 24])
+def test_rendered_windows_stay_in_sync_with_audio(fps):
+    # Many short windows whose lengths are not whole frames
+    windows = [(i * 2.0, i * 2.0 + 1.03) for i in range(103)]
+    plan = SegmentPlan(duration_s=206.0, windows=windows)
+    sources = frame_sources(plan, fps)
+    compact_s = 0.0
+    for start, end in windows:
+        for frame in range(round(start * fps), round(end * fps)):
+            # Compacted time of this frame's audio, in compacted frames
+            expected = (compact_s + frame / fps - start) * fps
+            assert abs(sources[frame] - expected) <= 1
+        compact_s += end - start
+
+
+def test_buffer_rejects_frames_that_left_the_window():
+    frames = _buffer(100, loop=4)
+    frames.get(50)
+    assert frames.get(2) == 2  # head
+    assert frames.get(46) == 46
+    with pytest.raises(RuntimeError):
+        frames.get(20)
+
+
+def test_buffer_without_frames():
+    with pytest.raises(RuntimeError):
+        _buffer(0, loop=4).get(0)
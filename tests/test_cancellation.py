@@ -0,0 +1,65 @@
+"""Tests for cancellation.run_cancellable with stub processes"""
+
+import shutil
+import subprocess
+import sys
+import time
+
+import pytest
+
+from cancellation import JobCancelled, run_cancellable
+
+SLEEP = shutil.which("sleep")
+needs_sleep = pytest.mark.skipif(SLEEP is None, reason="needs the sleep command")
+
+
+def test_returns_completed_process():
+    result = run_cancellable([sys.executable, "-c", "print('done')"], lambda: False, poll_interval_s=0.05)
+    assert result.returncode == 0
+    assert result.stdout.strip() == "done"
+
+
+def test_cancelled_before_start_does_not_spawn(tmp_path):
+    marker = tmp_path / "started"
+    with pytest.raises(JobCancelled):
+        run_cancellable([sys.executable, "-c", f"open({str(marker)!r}, 'w')"], lambda: True)
+    assert not marker.exists()
+
+
+@needs_sleep
+def test_cancel_terminates_with_sigterm():
+    checks = {"count": 0}
+
+    def is_cancelled():
+        checks["count"] += 1
+        return checks["count"] > 1  # False for the pre-start check, then cancel
+
+    start = time.monotonic()
+    with pytest.raises(JobCancelled):
+        run_cancellable([SLEEP, "30"], is_cancelled, poll_interval_s=0.05, grace_s=10)
+    # sleep exits on SIGTERM, so the grace period is not used up
+    assert time.monotonic() - start < 5
+
+
+def test_cancel_escalates_to_sigkill(tmp_path):
+    ready = tmp_path / "ready"
+    script = (
+        "import pathlib, signal, time\n"
+        "signal.signal(signal.SIGTERM, signal.SIG_IGN)\n"
+        f"pathlib.Path({str(ready)!r}).touch()\n"
+        "time.sleep(30)\n"
+    )
+    start = time.monotonic()
+    with pytest.raises(JobCancelled):
+        run_cancellable([sys.executable, "-c", script], ready.exists, poll_interval_s=0.05, grace_s=0.5)
+    elapsed = time.monotonic() - start
+    # Survived SIGTERM for the grace period, then was killed
+    assert 0.5 <= elapsed < 10
+
+
+@needs_sleep
+def test_timeout_kills_process():
+    start = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        run_cancellable([SLEEP, "30"], lambda: False, timeout=0.2, poll_interval_s=0.05, grace_s=5)
+    assert time.monotonic() - start < 5
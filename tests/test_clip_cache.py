@@ -0,0 +1,64 @@
+"""Tests for clip_cache hashing, job records and eviction"""
+
+import os
+
+import pytest
+
+from clip_cache import ClipStore, chain_hashes, valid_job_id
+
+
+def test_change_invalidates_the_clip_and_everything_after():
+    old = chain_hashes([b"a", b"b", b"c"], b"image")
+    new = chain_hashes([b"a", b"B", b"c"], b"image")
+    assert old[0] == new[0]
+    assert old[1] != new[1] and old[2] != new[2]
+
+
+@pytest.mark.parametrize("job_id", ["job-1", "A_b-9", "x" * 64])
+def test_job_round_trip(tmp_path, job_id):
+    store = ClipStore(str(tmp_path))
+    assert store.load_job(job_id) is None
+    store.save_job(job_id, ["h1", "h2"], resolution="720p")
+    assert store.load_job(job_id)["hashes"] == ["h1", "h2"]
+
+
+@pytest.mark.parametrize("job_id", ["", "../../models/x", "a/b", "..", "a.b", "x" * 65, "job\n"])
+def test_unsafe_job_ids_are_refused(tmp_path, job_id):
+    assert not valid_job_id(job_id)
+    store = ClipStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        store.save_job(job_id, ["h1"])
+    with pytest.raises(ValueError):
+        store.load_job(job_id)
+    assert not any(tmp_path.rglob("*.json"))
+
+
+def _clip(store, clip_hash, size, mtime):
+    path = store.path(clip_hash)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_evict_drops_least_recently_used_clips_past_the_cap(tmp_path):
+    store = ClipStore(str(tmp_path))
+    oldest = _clip(store, "aa01", 100, 1000)
+    used = _clip(store, "bb02", 100, 1001)
+    newest = _clip(store, "cc03", 100, 1002)
+    assert store.evict(max_bytes=200, max_age_s=10_000, keep=["bb02"], now=2000) == 1
+    assert not oldest.exists()
+    assert used.exists() and newest.exists()
+    # Splicing marked the kept clip as used
+    assert used.stat().st_mtime == 2000
+
+
+def test_evict_drops_old_clips_and_job_records(tmp_path):
+    store = ClipStore(str(tmp_path))
+    stale = _clip(store, "aa01", 10, 1000)
+    fresh = _clip(store, "bb02", 10, 5000)
+    store.save_job("old-job", ["aa01"])
+    os.utime(store.job_path("old-job"), (1000, 1000))
+    assert store.evict(max_bytes=10_000, max_age_s=3000, now=6000) == 1
+    assert not stale.exists() and fresh.exists()
+    assert store.load_job("old-job") is None
@@ -0,0 +1,88 @@
+"""Tests for compile_cache output shapes, keying and manifests"""
+
+import pytest
+
+from compile_cache import (
+    WARMUP_ASPECTS,
+    cache_dir,
+    cache_key,
+    changed,
+    list_caches,
+    output_dims,
+    read_manifest,
+    snapshot,
+    write_manifest,
+)
+
+# (width, height) the pipeline renders for each warm-up aspect per --size
+EXPECTED_DIMS = {
+    "640*480": {
+        "4:3": (640, 448),
+        "3:4": (448, 640),
+        "1:1": (512, 512),
+        "16:9": (704, 384),
+        "9:16": (384, 704),
+    },
+    "1024*704": {
+        "4:3": (960, 704),
+        "3:4": (704, 960),
+        "1:1": (832, 832),
+        "16:9": (1088, 640),
+        "9:16": (640, 1088),
+    },
+}
+
+
+@pytest.mark.parametrize("size", sorted(EXPECTED_DIMS))
+@pytest.mark.parametrize("aspect", sorted(WARMUP_ASPECTS))
+def test_output_dims_for_warmup_aspects(size, aspect):
+    width, height = WARMUP_ASPECTS[aspect]
+    dims = output_dims(width, height, size)
+    assert dims == EXPECTED_DIMS[size][aspect]
+    target_w, target_h = (int(v) for v in size.split("*"))
+    assert dims[0] * dims[1] <= target_w * target_h
+    assert dims[0] % 64 == 0 and dims[1] % 64 == 0
+
+
+def test_small_images_keep_their_size():
+    assert output_dims(512, 512, "1024*704") == (512, 512)
+
+
+def test_key_depends_on_dims():
+    base = cache_key("2.4.1+cu121", "NVIDIA A100-SXM4-80GB", "1024*704")
+    assert base == "torch-2.4.1-cu121__NVIDIA-A100-SXM4-80GB__1024x704"
+    keys = {
+        base,
+        cache_key("2.4.1+cu121", "NVIDIA A100-SXM4-80GB", "1024*704", (960, 704)),
+        cache_key("2.4.1+cu121", "NVIDIA A100-SXM4-80GB", "1024*704", (704, 960)),
+    }
+    assert len(keys) == 3
+    assert "/" not in cache_key("2.4/1", "GPU / x", "640*480")
+
+
+def test_snapshot_detects_new_and_rewritten_files(tmp_path):
+    assert snapshot(tmp_path / "missing") == {}
+    (tmp_path / "inductor").mkdir()
+    (tmp_path / "inductor" / "a.so").write_bytes(b"12")
+    before = snapshot(tmp_path)
+    assert before == {"inductor/a.so": 2}
+    assert not changed(before, snapshot(tmp_path))
+    (tmp_path / "inductor" / "a.so").write_bytes(b"123")
+    assert changed(before, snapshot(tmp_path))
+
+
+def test_manifest_round_trip_and_listing(tmp_path):
+    root = str(tmp_path)
+    assert list_caches(root) == {}
+    key = cache_key("2.4.1", "A100", "640*480", (640, 448))
+    directory = cache_dir(root, key)
+    (directory / "triton").mkdir(parents=True)
+    (directory / "triton" / "kernel.bin").write_bytes(b"x" * 10)
+    cache_dir(root, "empty").mkdir()
+
+    manifest = write_manifest(directory, key, size="640*480")
+    assert manifest["files"] == 1 and manifest["bytes"] == 10
+    assert read_manifest(directory) == manifest
+    # Rewriting does not count the manifest itself
+    assert write_manifest(directory, key)["files"] == 1
+    assert list(list_caches(root)) == [key]
@@ -0,0 +1,88 @@
+"""Tests for memory_planner mode selection and recalibration"""
+
+from memory_planner import OFFLOAD, REJECT, RESIDENT, MemoryPlanner, MemoryRequest
+
+CAPACITY_GB = 85.0
+NOW = 1_000_000.0
+
+
+def _request(size="1024*704", **kwargs):
+    return MemoryRequest.from_size(size, num_clips=4, **kwargs)
+
+
+def _oom_then_offload_oom(planner, request, at=NOW):
+    """Run out of memory, including on the offload retry after a resident OOM"""
+    plan = planner.plan(request, CAPACITY_GB, now=at)
+    if plan.mode == RESIDENT:
+        planner.record(plan, oom=True, size=request.size, at=at)
+        plan = planner.plan_mode(request, OFFLOAD, CAPACITY_GB, "fallback after OOM")
+    assert plan.mode == OFFLOAD
+    planner.record(plan, oom=True, size=request.size, at=at)
+
+
+def test_small_request_stays_resident():
+    plan = MemoryPlanner().plan(_request("640*480"), CAPACITY_GB)
+    assert plan.mode == RESIDENT
+    assert plan.estimate_gb < CAPACITY_GB
+
+
+def test_large_request_falls_back_to_offload():
+    planner = MemoryPlanner()
+    planner.calibrations["1024*704"] = 5.0
+    plan = planner.plan(_request(has_pose=True), CAPACITY_GB)
+    assert plan.mode == OFFLOAD and plan.offload
+
+
+def test_request_beyond_the_profile_is_rejected():
+    plan = MemoryPlanner().plan(MemoryRequest(width=4096, height=4096), CAPACITY_GB)
+    assert plan.mode == REJECT
+
+
+def test_one_offload_oom_does_not_lock_a_size_out():
+    planner = MemoryPlanner()
+    request = _request(has_pose=True)
+    _oom_then_offload_oom(planner, request)
+    assert planner.calibration(request.size) > 5
+    plan = planner.plan(request, CAPACITY_GB, now=NOW + 60)
+    assert plan.mode == OFFLOAD
+    # The state shared between containers plans the same way
+    restored = MemoryPlanner.from_state(planner.state())
+    assert restored.plan(request, CAPACITY_GB, now=NOW + 60).mode == OFFLOAD
+
+
+def test_calibration_is_per_size():
+    planner = MemoryPlanner()
+    _oom_then_offload_oom(planner, _request(has_pose=True))
+    assert planner.calibration("640*480") == 1.0
+    assert planner.plan(_request("640*480", has_pose=True), CAPACITY_GB).mode == RESIDENT
+
+
+def test_repeated_offload_ooms_reject_until_they_expire():
+    planner = MemoryPlanner()
+    request = _request(has_pose=True)
+    _oom_then_offload_oom(planner, request)
+    _oom_then_offload_oom(planner, request, at=NOW + 60)
+    assert planner.plan(request, CAPACITY_GB, now=NOW + 120).mode == REJECT
+    later = NOW + 60 + planner.reject_ttl_s + 1
+    assert planner.plan(request, CAPACITY_GB, now=later).mode == OFFLOAD
+
+
+def test_measured_peaks_bring_calibration_back_down():
+    planner = MemoryPlanner()
+    request = _request(has_pose=True)
+    _oom_then_offload_oom(planner, request)
+    for _ in range(20):
+        plan = planner.plan(request, CAPACITY_GB, now=NOW)
+        peak = plan.fixed_gb + plan.raw_activation_gb * 0.9
+        planner.record(plan, peak_gb=peak, size=request.size, at=NOW)
+    assert planner.calibration(request.size) == 1.0
+    assert planner.plan(request, CAPACITY_GB, now=NOW).mode == RESIDENT
+
+
+def test_peak_above_estimate_raises_calibration():
+    planner = MemoryPlanner()
+    request = _request()
+    plan = planner.plan(request, CAPACITY_GB)
+    planner.record(plan, peak_gb=plan.estimate_gb + 2.0, size=request.size)
+    assert planner.calibration(request.size) > 1.0
+    assert planner.plan(request, CAPACITY_GB).estimate_gb > plan.estimate_gb
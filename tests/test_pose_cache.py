@@ -0,0 +1,49 @@
+"""Tests for pose_cache keying, commands and lookup"""
+
+from pathlib import Path
+
+from compile_cache import output_dims
+from pose_cache import PoseCache, bucket_duration, cache_key, normalize_cmd
+
+
+def _filter(cmd):
+    return cmd[cmd.index("-vf") + 1]
+
+
+def test_normalize_crops_to_output_dims_of_the_image():
+    dims = output_dims(1920, 1080, "1024*704")
+    assert dims[0] > dims[1]  # landscape image, landscape output
+    video_filter = _filter(normalize_cmd(Path("in.mp4"), Path("out.mp4"), 16, 10.0, dims))
+    assert f"crop={dims[0]}:{dims[1]}" in video_filter
+    assert "1024:704" not in video_filter
+
+
+def test_normalize_without_dims_only_resamples():
+    assert _filter(normalize_cmd(Path("in.mp4"), Path("out.mp4"), 12, 10.0)) == "fps=12"
+
+
+def test_key_depends_on_dims_and_fps():
+    keys = {
+        cache_key(b"pose", 16, (960, 704)),
+        cache_key(b"pose", 16, (704, 960)),
+        cache_key(b"pose", 16),
+        cache_key(b"pose", 12, (960, 704)),
+    }
+    assert len(keys) == 4
+
+
+def test_bucket_adds_one_clip_of_margin():
+    assert bucket_duration(4.0) == 10
+    assert bucket_duration(10.0) == 15
+    assert bucket_duration(12.0, clip_s=6.0) == 18
+
+
+def test_lookup_returns_shortest_covering_entry(tmp_path):
+    cache = PoseCache(str(tmp_path))
+    directory = cache.root / "key"
+    directory.mkdir(parents=True)
+    for seconds in (10, 30, 120):
+        (directory / f"{seconds}s.mp4").write_bytes(b"x")
+    assert cache.lookup("key", 12.0) == (30, directory / "30s.mp4")
+    assert cache.lookup("key", 200.0) is None
+    assert cache.lookup("missing", 1.0) is None
@@ -0,0 +1,55 @@
+"""Tests for scheduler ordering, estimates and the dispatcher harness"""
+
+import pytest
+
+from scheduler import (
+    CLIP_SECONDS,
+    PriorityScheduler,
+    SchedulerConfig,
+    clip_seconds,
+    estimate_duration_s,
+)
+from simulate_scheduler import POLICIES, simulate, summarize, synthetic_trace
+
+
+def test_clip_length_follows_generation_fps():
+    assert clip_seconds() == CLIP_SECONDS == 5.0
+    assert clip_seconds(12) == pytest.approx(80 / 12)
+
+
+def test_estimate_needs_fewer_clips_at_low_fps():
+    native = estimate_duration_s(resolution="720p", audio_seconds=60)
+    low_fps = estimate_duration_s(resolution="720p", audio_seconds=60, generation_fps=12)
+    assert low_fps == pytest.approx(native * clip_seconds() / clip_seconds(12))
+    # An explicit clip count costs the same GPU time at any frame rate
+    assert estimate_duration_s(num_clips=4, generation_fps=12) == estimate_duration_s(num_clips=4)
+
+
+def test_new_interactive_job_beats_standard_job_waiting_five_minutes():
+    now = {"t": 0.0}
+    scheduler = PriorityScheduler(SchedulerConfig(), clock=lambda: now["t"])
+    scheduler.push("standard", priority="standard")
+    now["t"] = 300.0
+    scheduler.push("interactive", priority="interactive")
+    assert scheduler.pop().job_id == "interactive"
+
+
+def test_batch_is_not_starved():
+    now = {"t": 0.0}
+    scheduler = PriorityScheduler(SchedulerConfig(), clock=lambda: now["t"])
+    scheduler.push("batch", priority="batch")
+    now["t"] = 3 * 3600 + 1
+    scheduler.push("interactive", priority="interactive")
+    assert scheduler.pop().job_id == "batch"
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_priority_classes_help_interactive_without_sjf(seed):
+    trace = synthetic_trace(300, seed=seed)
+    fifo = simulate(trace, POLICIES["fifo"], 4)
+    priority = simulate(trace, POLICIES["priority"], 4)
+    assert priority["peak_running"] <= 4
+    fifo_stats = summarize(fifo["waits"]["interactive"])
+    priority_stats = summarize(priority["waits"]["interactive"])
+    assert priority_stats["p95_wait_s"] < fifo_stats["p95_wait_s"]
+    assert priority_stats["mean_wait_s"] < fifo_stats["mean_wait_s"]
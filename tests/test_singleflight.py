@@ -0,0 +1,115 @@
+"""Tests for singleflight.SingleFlight with a LocalRegistry"""
+
+import asyncio
+
+import pytest
+
+from singleflight import LocalRegistry, SingleFlight, request_key
+
+
+async def _no_remote(call_id):
+    raise AssertionError("local requests should not attach remotely")
+
+
+def test_request_key_ignores_dict_order():
+    a = request_key({"image": b"i", "audio": b"a"}, {"prompt": "x", "seed": 1})
+    b = request_key({"audio": b"a", "image": b"i"}, {"seed": 1, "prompt": "x"})
+    assert a == b
+    assert a != request_key({"image": b"i", "audio": b"b"}, {"prompt": "x", "seed": 1})
+
+
+def test_identical_requests_share_one_run():
+    async def scenario():
+        registry = LocalRegistry()
+        flight = SingleFlight(registry, attach=_no_remote)
+        release = asyncio.Event()
+        runs = []
+
+        async def leader(publish):
+            runs.append(1)
+            await publish("call-1")
+            await release.wait()
+            return b"video"
+
+        first = asyncio.ensure_future(flight.run("key", leader))
+        second = asyncio.ensure_future(flight.run("key", leader))
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(first, second)
+        return runs, sorted(results, key=lambda r: r[1]), await registry.get("key")
+
+    runs, results, record = asyncio.run(scenario())
+    assert runs == [1]
+    assert results == [(b"video", False), (b"video", True)]
+    assert record is None
+
+
+def test_work_cancelled_only_when_last_waiter_leaves():
+    async def scenario():
+        registry = LocalRegistry()
+        flight = SingleFlight(registry, attach=_no_remote)
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def leader(publish):
+            await publish("call-1")
+            started.set()
+            try:
+                await asyncio.sleep(3600)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        first = asyncio.ensure_future(flight.run("key", leader))
+        second = asyncio.ensure_future(flight.run("key", leader))
+        await started.wait()
+        assert flight.waiters("key") == 2
+
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        await asyncio.sleep(0)
+        still_running = not cancelled.is_set()
+        waiters_left = flight.waiters("key")
+
+        second.cancel()
+        await asyncio.gather(second, return_exceptions=True)
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        for _ in range(5):
+            await asyncio.sleep(0)
+        return still_running, waiters_left, await registry.get("key")
+
+    still_running, waiters_left, record = asyncio.run(scenario())
+    assert still_running
+    assert waiters_left == 1
+    assert record is None
+
+
+def test_failure_reaches_every_waiter():
+    async def scenario():
+        flight = SingleFlight(LocalRegistry(), attach=_no_remote)
+
+        async def leader(publish):
+            await asyncio.sleep(0)
+            raise RuntimeError("render failed")
+
+        return await asyncio.gather(
+            flight.run("key", leader), flight.run("key", leader), return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_stale_record_is_taken_over():
+    async def scenario():
+        now = {"t": 0.0}
+        registry = LocalRegistry()
+        await registry.put("key", {"owner": "gone", "call_id": "old", "started_at": -10_000.0})
+        flight = SingleFlight(registry, attach=_no_remote, ttl_s=60, clock=lambda: now["t"])
+
+        async def leader(publish):
+            return b"fresh"
+
+        return await flight.run("key", leader)
+
+    assert asyncio.run(scenario()) == (b"fresh", False)
@@ -12,9 +12,28 @@ import os
 import io
 from pathlib import Path
 
+import compile_cache
+import step_cache
+from cancellation import JobCancelled, run_cancellable
+from interpolation import LOW_FPS_CHOICES, METHODS as INTERPOLATION_METHODS, OUTPUT_FPS
+from memory_planner import (
+    OFFLOAD, REJECT, RESIDENT, InsufficientGPUMemory, MemoryPlanner, MemoryRequest,
+    is_oom, parse_peak,
+)
+from scheduler import (
+    CLIP_SECONDS, DEFAULT_PRIORITY, MODEL_FPS, PRIORITY_CLASSES, audio_duration_s, clip_seconds,
+)
+
 # Create Modal app
 app = modal.App("wan2-s2v")
 
+# Local helper modules shipped into every image
+LOCAL_MODULES = (
+    "scheduler", "autoscaler", "compile_cache", "step_cache", "interpolation",
+    "singleflight", "memory_planner", "cancellation", "audio_segments", "clip_cache",
+    "pose_cache",
+)
+
 # Define the image with all required dependencies
 image = (
     modal.Image.debian_slim(python_version="3.11")
@@ -44,6 +63,30 @@ image = (
         "cd /root && git clone https://github.com/Wan-Video/Wan2.2.git",
         "cd /root/Wan2.2 && pip install -e .",
     )
+    # Opt-in torch.compile of the DiT (set WAN2_COMPILE=1 when deploying)
+    .env({"WAN2_COMPILE": os.environ.get("WAN2_COMPILE", "0")})
+    # Local helper modules imported by this app
+    .add_local_python_source(*LOCAL_MODULES)
+    .add_local_file("wan2_runner.py", "/root/wan2_runner.py")
+)
+
+# Minimal image for the web endpoint and scheduled controller: no torch,
+# no Wan2.2 checkout, so containers pull and start in well under a second.
+# Heavy libraries are only imported inside GPU/CPU functions.
+web_image = (
+    modal.Image.debian_slim(python_version="3.11")
+    .pip_install("fastapi>=0.110.0", "pydantic>=2.0.0", "python-multipart")
+    .add_local_python_source(*LOCAL_MODULES)
+)
+
+# CPU-only image for audio analysis, frame interpolation and muxing
+cpu_image = (
+    modal.Image.debian_slim(python_version="3.11")
+    .apt_install("ffmpeg", "libsndfile1")
+    .pip_install(
+        "opencv-python-headless>=4.8.0", "numpy", "librosa>=0.10.0", "soundfile>=0.12.0", "pillow",
+    )
+    .add_local_python_source(*LOCAL_MODULES)
 )
 
 # Model configuration
@@ -51,6 +94,32 @@ MODEL_ID = "Wan-AI/Wan2.2-S2V-14B"
 MODEL_CACHE_DIR = "/cache/models"
 GITHUB_REPO = "https://github.com/Wan-Video/Wan2.2.git"
 
+# Resolution presets -> --size for generate.py
+SIZE_MAP = {
+    "480p": "640*480",
+    "720p": "1024*704",
+}
+
+
+def memory_request(
+    resolution: str,
+    audio_bytes: bytes,
+    num_clips: int = None,
+    has_pose: bool = False,
+    generation_fps: int = None,
+) -> MemoryRequest:
+    """MemoryRequest for a generation, as planned by the web endpoint and the GPU worker"""
+    clip_s = clip_seconds(generation_fps)
+    return MemoryRequest.from_size(
+        SIZE_MAP.get(resolution, SIZE_MAP["720p"]),
+        num_clips=num_clips or max(1, round(audio_duration_s(audio_bytes) / clip_s)),
+        has_pose=has_pose,
+    )
+
+
+# Launcher that runs Wan2.2 generate.py with opt-in patches (torch.compile, ...)
+RUNNER_PATH = "/root/wan2_runner.py"
+
 # Model files (49.1 GB total)
 MODEL_FILES = {
     "diffusion_model_shards": [
@@ -69,13 +138,77 @@ MODEL_FILES = {
 # Volume for model caching
 volume = modal.Volume.from_name("wan2-models", create_if_missing=True)
 
+# GPU containers available to the dispatcher in the web endpoint
+GPU_MAX_CONTAINERS = 4
+
+# Modal timeout of one GPU call; every generation attempt in it shares this budget
+GPU_TIMEOUT_S = 1800
+# Kept back from the budget for reading the output and persisting caches
+GPU_FINISH_RESERVE_S = 60
+# An OOM fallback is not started with less time than this left
+MIN_ATTEMPT_S = 120
+
+# Device memory of gpu="A100-80GB" as torch reports it (total_memory / 1e9),
+# used for admission before a GPU is assigned
+GPU_MEMORY_GB = 85.0
+
+# Batch runs (the `batch` entrypoint) spawn GPU calls directly, so they reserve
+# slots that the web dispatcher stops using. At least one GPU always stays with
+# the web endpoint.
+BATCH_MAX_SLOTS = GPU_MAX_CONTAINERS - 1
+BATCH_RESERVATION_KEY = "batch_reservation"
+BATCH_RESERVATION_TTL_S = 120  # An interrupted batch run frees its slots after this
+
+# Shared metrics for the warm pool controller (arrivals, cold starts, queue)
+metrics = modal.Dict.from_name("wan2-metrics", create_if_missing=True)
+
+# Cold-start samples from GPU containers; only warm_pool_controller consumes them,
+# so concurrent reports never overwrite each other
+cold_start_events = modal.Queue.from_name("wan2-cold-starts", create_if_missing=True)
+
+# Registry of in-flight generations, for coalescing identical requests
+inflight_calls = modal.Dict.from_name("wan2-inflight", create_if_missing=True)
+
+# Cancellation flags by job ID, polled by GPU workers during generation
+cancel_flags = modal.Dict.from_name("wan2-cancel", create_if_missing=True)
+
+
+
+def call_cancelled() -> bool:
+    """True if the web endpoint flagged the current Modal call for cancellation"""
+    call_id = modal.current_function_call_id()
+    return bool(call_id) and cancel_flags.contains(call_id)
+
+
+def clear_cancel_flag():
+    """
+    Drop the current call's cancellation flag once the call is over
+    
+    A flag written after this (the client left just as the call finished)
+    is keyed on a call ID that is never checked again, and expires with the
+    Dict's idle-entry TTL.
+    """
+    call_id = modal.current_function_call_id()
+    if not call_id:
+        return
+    try:
+        cancel_flags.pop(call_id, None)
+    except Exception as e:
+        print(f"⚠️  Could not clear cancellation flag: {e}")
+
+
+# Known peak hours (UTC) that always keep GPUs warm, e.g.
+# autoscaler.PeakWindow(start_hour=14, end_hour=18, min_containers=2, weekdays=(0, 1, 2, 3, 4))
+PEAK_WINDOWS = []
+
 
 @app.cls(
     image=image,
     gpu="A100-80GB",  # Minimum for single-GPU deployment
-    timeout=1800,  # 30 minutes for video generation
+    timeout=GPU_TIMEOUT_S,  # 30 minutes for video generation
     volumes={MODEL_CACHE_DIR: volume},
     scaledown_window=600,  # Keep warm for 10 minutes
+    max_containers=GPU_MAX_CONTAINERS,
 )
 class Wan2S2VModel:
     """Wan2.2 S2V Model Class for Modal deployment"""
@@ -85,8 +218,10 @@ class Wan2S2VModel:
         """Load the Wan2.2 S2V model on container startup"""
         import sys
         import subprocess
+        import time
         from huggingface_hub import snapshot_download
         
+        load_start = time.time()
         print("=" * 70)
         print("Loading Wan2.2-S2V-14B Model")
         print("=" * 70)
@@ -116,7 +251,107 @@ class Wan2S2VModel:
         self.model_dir = model_dir
         self.ckpt_dir = model_dir
         
-        # Import Wan2.2 modules
+        # Cold starts are measured from the spawn of this container's first
+        # input (see _note_input), which also covers scheduling and image pull
+        self.container_started_at = load_start
+        self.served_input = False
+        
+        # Step 3: Load persisted torch.compile caches (opt-in)
+        print("\n[3/3] Checking compile cache...")
+        self.compile_enabled = compile_cache.compile_enabled()
+        self.torch_version = compile_cache.detect_torch_version()
+        self.gpu_name = compile_cache.detect_gpu_name()
+        if self.compile_enabled:
+            warmed = compile_cache.list_caches(MODEL_CACHE_DIR)
+            print(f"✅ torch.compile enabled ({self.torch_version}, {self.gpu_name})")
+            for key in warmed:
+                print(f"   Cached: {key}")
+            if not warmed:
+                print("   No warmed caches yet; first request per resolution will compile")
+        else:
+            print("torch.compile disabled (set WAN2_COMPILE=1 to enable)")
+        
+        # Device memory for admission control
+        try:
+            import torch
+            self.gpu_memory_gb = torch.cuda.get_device_properties(0).total_memory / 1e9
+        except Exception:
+            self.gpu_memory_gb = GPU_MEMORY_GB
+        print(f"GPU memory: {self.gpu_memory_gb:.1f} GB")
+    
+    def _note_input(self, spawned_at: float = None):
+        """
+        Report a cold start if this container was started for this input
+        
+        Spawn-to-here covers scheduling, image pull and load_model. Weights
+        are loaded by the generation subprocess on every request, warm or
+        not, so they are not part of the cold-start penalty. A pre-warmed
+        container started before the spawn did not make the caller wait.
+        """
+        import time
+        
+        first, self.served_input = not self.served_input, True
+        if not first or spawned_at is None or self.container_started_at < spawned_at:
+            return
+        seconds = time.time() - spawned_at
+        print(f"Cold start: {seconds:.1f}s from spawn to first input")
+        try:
+            cold_start_events.put(seconds)
+        except Exception as e:
+            print(f"⚠️  Could not record cold start: {e}")
+    
+    def _memory_planner(self) -> MemoryPlanner:
+        """Planner calibrated with OOM/peak events from all containers"""
+        try:
+            return MemoryPlanner.from_state(metrics.get("memory_planner", {}))
+        except Exception as e:
+            print(f"⚠️  Could not load memory calibration: {e}")
+            return MemoryPlanner()
+    
+    def _record_memory(self, planner: MemoryPlanner, plan, size: str, oom: bool = False, peak_gb: float = None):
+        """Record a run outcome and share the updated calibration"""
+        planner.record(plan, oom=oom, peak_gb=peak_gb, size=size)
+        try:
+            metrics["memory_planner"] = planner.state()
+        except Exception as e:
+            print(f"⚠️  Could not save memory calibration: {e}")
+    
+    def _compile_cache_dir(self, size: str, dims: tuple = None):
+        """Volume directory for this container's compile cache at a size and output shape"""
+        key = compile_cache.cache_key(self.torch_version, self.gpu_name, size, dims)
+        return key, compile_cache.cache_dir(MODEL_CACHE_DIR, key)
+    
+    def _generation_env(
+        self,
+        size: str,
+        step_cache_threshold: float = None,
+        generation_fps: int = None,
+        dims: tuple = None,
+    ) -> dict:
+        """Environment for the generation subprocess"""
+        env = dict(os.environ)
+        if self.compile_enabled:
+            _, directory = self._compile_cache_dir(size, dims)
+            env.update(compile_cache.prepare(directory))
+        if step_cache_threshold:
+            env["WAN2_STEP_CACHE_THRESHOLD"] = str(step_cache_threshold)
+        if generation_fps:
+            env["WAN2_SAMPLE_FPS"] = str(generation_fps)
+        return env
+    
+    def _persist_compile_cache(self, size: str, before: dict, dims: tuple = None):
+        """Commit new inductor/Triton artifacts to the Volume"""
+        if not self.compile_enabled:
+            return
+        key, directory = self._compile_cache_dir(size, dims)
+        if compile_cache.changed(before, compile_cache.snapshot(directory)):
+            compile_cache.write_manifest(
+                directory, key, torch=self.torch_version, gpu=self.gpu_name, size=size,
+                dims=list(dims) if dims else None,
+            )
+            volume.commit()
+            print(f"✅ Compile cache saved: {key}")
+    
     @modal.method()
     def generate(
         self,
@@ -126,6 +361,11 @@ class Wan2S2VModel:
         resolution: str = "720p",
         num_clips: int = None,
         pose_video_bytes: bytes = None,
+        step_cache_threshold: float = None,
+        generation_fps: int = None,
+        job_id: str = None,
+        base_seed: int = None,
+        spawned_at: float = None,
     ) -> bytes:
         """
         Generate a video from audio and reference image
@@ -143,15 +383,59 @@ class Wan2S2VModel:
             resolution: "480p" (640x480) or "720p" (1024x704)
             num_clips: Number of clips (auto-adjusts to audio length if None)
             pose_video_bytes: Optional pose video for pose-driven generation
+            step_cache_threshold: Reuse DiT outputs between denoising steps whose
+                input changed less than this (e.g. 0.1); None/0 disables
+            generation_fps: Render at this reduced frame rate (12 or 16) with
+                audio aligned to it; upsample with upsample_video afterwards
+            job_id: Job ID for logs. Cancellation is keyed on this call's
+                FunctionCall ID in cancel_flags; a cancelled job is terminated
+                between steps and its GPU memory released
+            base_seed: Fixed sampling seed for reproducible renders (random if None)
+            spawned_at: Caller's time.time() at spawn, for cold-start measurement
         
         Returns:
-            Video as bytes (MP4 format, 24fps)
+            Video as bytes (MP4 format, 24fps or generation_fps)
         """
+        self._note_input(spawned_at)
+        try:
+            return self._render(
+                image_bytes=image_bytes,
+                audio_bytes=audio_bytes,
+                prompt=prompt,
+                resolution=resolution,
+                num_clips=num_clips,
+                pose_video_bytes=pose_video_bytes,
+                step_cache_threshold=step_cache_threshold,
+                generation_fps=generation_fps,
+                job_id=job_id,
+                base_seed=base_seed,
+            )
+        finally:
+            clear_cancel_flag()
+    
+    def _render(
+        self,
+        image_bytes: bytes,
+        audio_bytes: bytes,
+        prompt: str = "",
+        resolution: str = "720p",
+        num_clips: int = None,
+        pose_video_bytes: bytes = None,
+        step_cache_threshold: float = None,
+        generation_fps: int = None,
+        job_id: str = None,
+        base_seed: int = None,
+    ) -> bytes:
+        """Body of generate(), run while the call's cancellation flag is live"""
         import tempfile
         import subprocess
         import sys
+        import time
         from pathlib import Path
         
+        # Every attempt below shares the call's budget
+        deadline = time.time() + GPU_TIMEOUT_S - GPU_FINISH_RESERVE_S
+        
         print("=" * 70)
         print("🎬 Starting Wan2.2-S2V Video Generation")
         print("=" * 70)
@@ -159,13 +443,14 @@ class Wan2S2VModel:
         print(f"Prompt: {prompt}")
         print(f"Has pose video: {pose_video_bytes is not None}")
         print(f"Num clips: {num_clips if num_clips else 'auto (based on audio)'}")
+        print(f"Step cache: {step_cache_threshold or 'off'}")
+        print(f"Generation fps: {generation_fps or 'default'}")
+        
+        if generation_fps and generation_fps not in LOW_FPS_CHOICES:
+            raise ValueError(f"generation_fps must be one of {LOW_FPS_CHOICES}")
         
         # Determine size based on resolution
-        size_map = {
-            "480p": "640*480",
-            "720p": "1024*704",
-        }
-        size = size_map.get(resolution, "1024*704")
+        size = SIZE_MAP.get(resolution, SIZE_MAP["720p"])
         
         # Create temporary directory for processing
         with tempfile.TemporaryDirectory() as tmpdir:
@@ -187,14 +472,24 @@ class Wan2S2VModel:
                 pose_path.write_bytes(pose_video_bytes)
                 print(f"✅ Pose video saved: {pose_path}")
             
+            # Choose resident or offloaded mode from the VRAM estimate
+            planner = self._memory_planner()
+            request = memory_request(
+                resolution, audio_bytes, num_clips, pose_video_bytes is not None, generation_fps
+            )
+            plan = planner.plan(request, self.gpu_memory_gb)
+            print(f"Memory plan: {plan.mode} (~{plan.estimate_gb:.1f} GB; {plan.reason})")
+            if plan.mode == REJECT:
+                raise InsufficientGPUMemory(f"Request does not fit on this GPU: {plan.reason}")
+            
             # Build command
             print("\n[2/4] Preparing generation command...")
             cmd = [
-                "python", "/root/Wan2.2/generate.py",
+                "python", RUNNER_PATH,
                 "--task", "s2v-14B",
                 "--size", size,
                 "--ckpt_dir", self.ckpt_dir,
-                "--offload_model", "True",
+                "--offload_model", str(plan.offload),
                 "--convert_model_dtype",
                 "--image", str(image_path),
                 "--audio", str(audio_path),
@@ -210,31 +505,83 @@ class Wan2S2VModel:
             if pose_video_bytes:
                 cmd.extend(["--pose_video", str(pose_path)])
             
+            if base_seed is not None:
+                cmd.extend(["--base_seed", str(base_seed)])
+            
             print(f"Command: {' '.join(cmd)}")
             
             # Run generation
             print("\n[3/4] Generating video (this may take 15-20 minutes)...")
             print("Please wait while the model processes your request...")
             
-            try:
-                result = subprocess.run(
-                    cmd,
-                    cwd="/root/Wan2.2",
-                    capture_output=True,
-                    text=True,
-                    timeout=1800,  # 30 minute timeout
-                )
+            # Static-shape compiles are per output shape, which follows the image
+            image_dims = compile_cache.image_size(image_bytes) if self.compile_enabled else None
+            dims = compile_cache.output_dims(*image_dims, size) if image_dims else None
+            cache_before = (
+                compile_cache.snapshot(self._compile_cache_dir(size, dims)[1])
+                if self.compile_enabled else {}
+            )
+            
+            while True:
+                cmd[cmd.index("--offload_model") + 1] = str(plan.offload)
+                # Attempts share the call's budget, so a retry cannot outlive the Modal timeout
+                remaining = deadline - time.time()
+                try:
+                    result = run_cancellable(
+                        cmd,
+                        call_cancelled,
+                        cwd="/root/Wan2.2",
+                        timeout=remaining,
+                        env=self._generation_env(size, step_cache_threshold, generation_fps, dims),
+                    )
+                except subprocess.TimeoutExpired:
+                    raise RuntimeError(f"Video generation timed out after {remaining / 60:.0f} minutes")
+                except JobCancelled:
+                    print(f"🛑 Job {job_id or modal.current_function_call_id()} cancelled; GPU released")
+                    raise
                 
-                if result.returncode != 0:
-                    print(f"❌ Generation failed with code {result.returncode}")
-                    print(f"STDOUT: {result.stdout}")
-                    print(f"STDERR: {result.stderr}")
-                    raise RuntimeError(f"Video generation failed: {result.stderr}")
+                if result.returncode == 0:
+                    self._record_memory(planner, plan, size, peak_gb=parse_peak(result.stdout))
+                    break
                 
-                print("✅ Video generation complete!")
+                if is_oom(result.stderr):
+                    self._record_memory(planner, plan, size, oom=True)
+                    if plan.mode == RESIDENT:
+                        if deadline - time.time() < MIN_ATTEMPT_S:
+                            raise InsufficientGPUMemory(
+                                f"Out of GPU memory in resident mode with no time left to retry "
+                                f"with offloading ({size}, {request.num_clips} clips)"
+                            )
+                        print("⚠️  Out of memory in resident mode, retrying with model offloading")
+                        plan = planner.plan_mode(
+                            request, OFFLOAD, self.gpu_memory_gb, "fallback after OOM"
+                        )
+                        continue
+                    raise InsufficientGPUMemory(
+                        f"Out of GPU memory even with model offloading ({size}, "
+                        f"{request.num_clips} clips)"
+                    )
                 
-            except subprocess.TimeoutExpired:
-                raise RuntimeError("Video generation timed out after 30 minutes")
+                print(f"❌ Generation failed with code {result.returncode}")
+                print(f"STDOUT: {result.stdout}")
+                print(f"STDERR: {result.stderr}")
+                raise RuntimeError(f"Video generation failed: {result.stderr}")
+            
+            print("✅ Video generation complete!")
+            
+            stats = step_cache.parse_report(result.stdout)
+            if stats:
+                print(
+                    f"Step cache: skipped {stats['skipped']}/{stats['steps']} steps "
+                    f"({stats['skip_rate']:.0%})"
+                )
+                try:
+                    history = metrics.get("step_cache", [])
+                    metrics["step_cache"] = (history + [{**stats, "size": size}])[-50:]
+                except Exception as e:
+                    print(f"⚠️  Could not record step cache stats: {e}")
+            
+            self._persist_compile_cache(size, cache_before, dims)
             
             # Read generated video
             print("\n[4/4] Reading generated video...")
@@ -265,22 +612,166 @@ class Wan2S2VModel:
         # Step 6: Return video bytes
         
         raise NotImplementedError("Video generation not yet implemented")
+    
+    @modal.method()
+    def warmup_compile(self, resolutions: list = None, aspects: list = None) -> dict:
+        """
+        Precompile the DiT for each resolution and aspect ratio and persist the caches
+        
+        Runs one short clip per resolution and reference-image aspect ratio
+        on synthetic inputs so that inductor/Triton artifacts for those
+        output shapes land on the Volume before real traffic arrives.
+        
+        Args:
+            resolutions: Resolution presets to warm (default: all of SIZE_MAP)
+            aspects: Keys of compile_cache.WARMUP_ASPECTS (default: all)
+        
+        Returns:
+            Compile cache manifests keyed by cache key
+        """
+        import struct
+        import time
+        import wave
+        from PIL import Image
+        
+        if not self.compile_enabled:
+            raise RuntimeError("torch.compile is disabled; deploy with WAN2_COMPILE=1")
+        
+        # 5 seconds of silence; one synthetic reference image per aspect ratio
+        audio_buffer = io.BytesIO()
+        with wave.open(audio_buffer, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(16000)
+            wav.writeframes(struct.pack("<h", 0) * 16000 * 5)
+        
+        for aspect in aspects or list(compile_cache.WARMUP_ASPECTS):
+            if aspect not in compile_cache.WARMUP_ASPECTS:
+                raise ValueError(
+                    f"Unknown aspect '{aspect}'. Expected one of: {', '.join(compile_cache.WARMUP_ASPECTS)}"
+                )
+            image_buffer = io.BytesIO()
+            Image.new("RGB", compile_cache.WARMUP_ASPECTS[aspect], (128, 128, 128)).save(
+                image_buffer, format="JPEG"
+            )
+            for resolution in resolutions or list(SIZE_MAP):
+                print(f"\n🔥 Warming compile cache for {resolution} {aspect}...")
+                start = time.time()
+                self.generate.local(
+                    image_bytes=image_buffer.getvalue(),
+                    audio_bytes=audio_buffer.getvalue(),
+                    resolution=resolution,
+                    num_clips=1,
+                )
+                print(f"✅ {resolution} {aspect} warmed in {time.time() - start:.0f}s")
+        
+        return compile_cache.list_caches(MODEL_CACHE_DIR)
 
 
 # Web endpoint for REST API access
 @app.function(
-    image=image,
+    image=web_image,
     secrets=[modal.Secret.from_name("wan2-api-keys")],  # Create this secret in Modal dashboard
+    max_containers=1,  # Single dispatcher so queue ordering is global
 )
+@modal.concurrent(max_inputs=200)  # Waiting requests are cheap coroutines
 @modal.asgi_app()
 def fastapi_app():
-    from fastapi import FastAPI, HTTPException, Header, Depends, UploadFile, File, Form
+    from fastapi import FastAPI, HTTPException, Header, Depends, UploadFile, File, Form, Request
     from pydantic import BaseModel
+    import asyncio
     import base64
+    import hashlib
     import os
+    import uuid
+    import time
+    from autoscaler import MetricsWindow
+    from clip_cache import valid_job_id
+    from scheduler import GPUDispatcher, estimate_duration_s, reserved_slots
+    from singleflight import ModalDictRegistry, SingleFlight, request_key
     
     web_app = FastAPI(title="Wan2.2 S2V API", version="0.1.0")
     
+    # Orders GPU calls by priority class, waiting time and estimated duration
+    dispatcher = GPUDispatcher(capacity=GPU_MAX_CONTAINERS)
+    dispatcher.scheduler.config.duration_weight = float(
+        os.environ.get("WAN2_SJF_WEIGHT", "0.5")
+    )
+    
+    # In-flight request registry shared by all web containers
+    async def attach_to_call(call_id: str) -> bytes:
+        return await modal.FunctionCall.from_id(call_id).get.aio()
+    
+    inflight = SingleFlight(ModalDictRegistry(inflight_calls), attach=attach_to_call)
+    
+    # Requests in progress on this container: job ID -> {"task", "key", "cancelled"}.
+    # Reserved as soon as the request is accepted, so a job ID is never in use twice
+    active_requests = {}
+    
+    # Request key -> job ID of the request leading its render, so coalesced
+    # followers can report the leader's queue position
+    leader_jobs = {}
+    
+    async def cancel_on_disconnect(request: Request, task: asyncio.Task):
+        """Cancel a request's work when its client goes away"""
+        while not task.done():
+            if await request.is_disconnected():
+                print("Client disconnected; cancelling request")
+                task.cancel()
+                return
+            await asyncio.sleep(1.0)
+    
+    # Arrival/job statistics published for the warm pool controller
+    traffic = MetricsWindow()
+    
+    async def publish_metrics():
+        # Also persists the queue, so a replacement container can report what was lost
+        try:
+            await metrics.put.aio("web", {
+                **traffic.to_dict(),
+                "queue_depth": len(dispatcher.scheduler),
+                "running": len(dispatcher.running),
+                "queue": dispatcher.status(),
+                "updated_at": time.time(),
+            })
+        except Exception as e:
+            print(f"⚠️  Could not publish metrics: {e}")
+    
+    async def follow_batch_reservation():
+        """Hand GPU slots to a running batch entrypoint and take them back after"""
+        while True:
+            try:
+                reservation = await metrics.get.aio(BATCH_RESERVATION_KEY, None)
+            except Exception as e:
+                print(f"⚠️  Could not read batch reservation: {e}")
+            else:
+                capacity = GPU_MAX_CONTAINERS - min(reserved_slots(reservation), BATCH_MAX_SLOTS)
+                if capacity != dispatcher.capacity:
+                    print(f"GPU slots for the web endpoint: {dispatcher.capacity} -> {capacity}")
+                    dispatcher.set_capacity(capacity)
+                    await publish_metrics()
+            await asyncio.sleep(15)
+    
+    @web_app.on_event("startup")
+    async def start_batch_reservation_watcher():
+        asyncio.create_task(follow_batch_reservation())
+    
+    @web_app.on_event("startup")
+    async def report_previous_queue():
+        """Log jobs a previous web container was holding when it went away"""
+        try:
+            previous = (await metrics.get.aio("web", {})).get("queue") or {}
+        except Exception as e:
+            print(f"⚠️  Could not read previous queue state: {e}")
+            return
+        running = previous.get("running", [])
+        waiting = [job["job_id"] for job in previous.get("waiting", [])]
+        if running or waiting:
+            print(
+                f"⚠️  Previous web container left {len(running)} running and "
+                f"{len(waiting)} queued jobs; their clients must resubmit: {running + waiting}"
+            )
+    
     # API Key validation
     def verify_api_key(x_api_key: str = Header(None)):
         """Verify API key from request header"""
@@ -322,6 +813,9 @@ def fastapi_app():
             "version": "0.1.0",
             "endpoints": {
                 "POST /generate-video": "Generate video from audio and image",
+                "GET /queue": "GPU queue status",
+                "GET /queue/{job_id}": "Queue position of a job",
+                "DELETE /jobs/{job_id}": "Cancel a job",
                 "GET /health": "Health check",
             },
             "authentication": {
@@ -335,6 +829,7 @@ def fastapi_app():
                 "output": "MP4 (24fps)"
             },
             "resolutions": ["480p", "720p"],
+            "priorities": list(PRIORITY_CLASSES),
             "note": "Implementation in progress"
         }
     
@@ -343,14 +838,78 @@ def fastapi_app():
         """Simple health check endpoint"""
         return {"status": "healthy", "model": "Wan2.2-S2V-14B"}
     
+    @web_app.get("/queue")
+    def queue_status(authenticated: bool = Depends(verify_api_key)):
+        """Running and waiting jobs in dispatch order"""
+        return dispatcher.status()
+    
+    @web_app.get("/queue/{job_id}")
+    def queue_position(job_id: str, authenticated: bool = Depends(verify_api_key)):
+        """
+        Queue position of a job (0 = running on a GPU)
+        
+        A request coalesced onto another one's render reports the leader's
+        position; one still being prepared on CPU reports "preparing".
+        """
+        position = dispatcher.position(job_id)
+        active = active_requests.get(job_id)
+        if position is None and active is None:
+            raise HTTPException(status_code=404, detail=f"Job '{job_id}' is not queued or running")
+        response = {"job_id": job_id}
+        if position is None:
+            leader = leader_jobs.get(active["key"])
+            if leader and leader != job_id:
+                position = dispatcher.position(leader)
+                response["attached_to"] = leader
+        if position is None:
+            return {**response, "position": None, "status": "preparing"}
+        return {
+            **response,
+            "position": position,
+            "status": "running" if position == 0 else "queued",
+        }
+    
+    @web_app.delete("/jobs/{job_id}")
+    async def cancel_job(job_id: str, authenticated: bool = Depends(verify_api_key)):
+        """
+        Cancel a queued or running job
+        
+        The GPU render is stopped unless identical requests coalesced onto
+        it are still waiting, in which case only this request detaches.
+        """
+        active = active_requests.get(job_id)
+        if active is None:
+            raise HTTPException(status_code=404, detail=f"Job '{job_id}' is not queued or running")
+        active["cancelled"] = True
+        task = active["task"]
+        if task is None:
+            # Still preparing on CPU; it stops before it queues for a GPU
+            return {"job_id": job_id, "status": "cancelled"}
+        shared = inflight.waiters(active["key"]) > 1
+        task.cancel()
+        return {
+            "job_id": job_id,
+            "status": "detached" if shared else "cancelled",
+        }
+    
     @web_app.post("/generate-video")
     async def generate_video(
+        request: Request,
         image: UploadFile = File(...),
         audio: UploadFile = File(...),
         prompt: str = Form(""),
         resolution: str = Form("720p"),
         num_clips: int = Form(None),
         pose_video: UploadFile = File(None),
+        step_cache_threshold: float = Form(None),
+        generation_fps: int = Form(None),
+        interpolation: str = Form("flow"),
+        skip_silence: bool = Form(False),
+        incremental: bool = Form(False),
+        seed: int = Form(42),
+        prior_job_id: str = Form(None),
+        priority: str = Form(DEFAULT_PRIORITY),
+        job_id: str = Form(None),
         authenticated: bool = Depends(verify_api_key)
     ):
         """
@@ -366,44 +925,595 @@ def fastapi_app():
         - resolution: "480p" or "720p"
         - num_clips: Number of video clips (optional, auto-adjusts to audio length)
         - pose_video: Optional pose video for pose-driven generation (MP4)
+        - step_cache_threshold: Opt-in denoising step reuse, e.g. 0.1 (faster, slight quality cost)
+        - generation_fps: Render at 12 or 16 fps and interpolate to 24 fps on CPU (optional)
+        - interpolation: "flow" or "blend" (used with generation_fps)
+        - skip_silence: Render only speech and fill long silences with looped idle motion
+        - incremental: Reuse cached clips and re-render only from the first changed one
+        - seed: Base seed for incremental renders (keep fixed between submissions)
+        - prior_job_id: Earlier job_id to diff clips against (incremental only)
+        - priority: "interactive", "standard" or "batch"
+        - job_id: Optional client-chosen ID for GET /queue/{job_id} and DELETE /jobs/{job_id}
+          (1-64 letters, digits, "_" or "-")
         """
+        if priority not in PRIORITY_CLASSES:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Invalid priority. Expected one of: {', '.join(PRIORITY_CLASSES)}",
+            )
+        if generation_fps is not None and generation_fps not in LOW_FPS_CHOICES:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Invalid generation_fps. Expected one of: {', '.join(map(str, LOW_FPS_CHOICES))}",
+            )
+        if interpolation not in INTERPOLATION_METHODS:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Invalid interpolation. Expected one of: {', '.join(INTERPOLATION_METHODS)}",
+            )
+        for name, value in (("job_id", job_id), ("prior_job_id", prior_job_id)):
+            if value is not None and not valid_job_id(value):
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"Invalid {name}. Use 1-64 letters, digits, '_' or '-'",
+                )
+        job_id = job_id or uuid.uuid4().hex
+        if job_id in active_requests:
+            raise HTTPException(status_code=409, detail=f"Job '{job_id}' is already in progress")
+        # Claimed before the first await, so a concurrent duplicate gets the 409
+        active = active_requests[job_id] = {"task": None, "key": None, "cancelled": False}
+        
         try:
             # Read uploaded files
             image_bytes = await image.read()
             audio_bytes = await audio.read()
             pose_video_bytes = await pose_video.read() if pose_video else None
+            # Clip hashes use the upload, not the pose video prepared for this length
+            pose_video_hash = hashlib.sha256(pose_video_bytes).hexdigest() if pose_video_bytes else None
             
-            # Generate video
-            model = Wan2S2VModel()
-            video_bytes = model.generate.remote(
-                image_bytes=image_bytes,
-                audio_bytes=audio_bytes,
-                prompt=prompt,
+            # Audio covered by one generated clip at the requested frame rate
+            clip_s = clip_seconds(generation_fps)
+            
+            # Render only the speech-bearing parts of the audio when that pays off
+            render_audio_bytes, render_clips, segment_plan = audio_bytes, num_clips, None
+            if skip_silence:
+                analysis = await plan_silence.remote.aio(
+                    audio_bytes, pose_video_bytes=pose_video_bytes, clip_s=clip_s
+                )
+                if analysis["audio"] is not None:
+                    segment_plan = analysis["plan"]
+                    render_audio_bytes = analysis["audio"]
+                    # The pose video follows the original timeline; keep it in sync
+                    pose_video_bytes = analysis["pose_video"] or pose_video_bytes
+                    planned = analysis["num_clips"]
+                    render_clips = min(num_clips, planned) if num_clips else planned
+            
+            # Decode, resample and resize the pose video on CPU (cached)
+            if pose_video_bytes:
+                pose_video_bytes = await prepare_pose.remote.aio(
+                    pose_video_bytes,
+                    resolution=resolution,
+                    fps=generation_fps or MODEL_FPS,
+                    duration_s=render_clips * clip_s if render_clips else None,
+                    clip_s=clip_s,
+                    image_bytes=image_bytes,
+                    audio_bytes=render_audio_bytes,
+                )
+            
+            estimated_s = estimate_duration_s(
                 resolution=resolution,
-                num_clips=num_clips,
-                pose_video_bytes=pose_video_bytes,
+                audio_seconds=audio_duration_s(render_audio_bytes),
+                num_clips=render_clips,
+                has_pose=pose_video_bytes is not None,
+                generation_fps=generation_fps,
             )
             
+            # Reject requests that cannot fit on the GPU before they take a slot
+            try:
+                planner = MemoryPlanner.from_state(await metrics.get.aio("memory_planner", {}))
+            except Exception as e:
+                print(f"⚠️  Could not load memory calibration: {e}")
+                planner = MemoryPlanner()
+            plan = planner.plan(
+                memory_request(
+                    resolution, render_audio_bytes, render_clips, pose_video_bytes is not None, generation_fps
+                ),
+                GPU_MEMORY_GB,
+            )
+            if plan.mode == REJECT:
+                raise InsufficientGPUMemory(f"Request does not fit on the GPU: {plan.reason}")
+            
+            traffic.record_arrival()
+            await publish_metrics()
+            
+            async def result_of(call):
+                try:
+                    return await call.get.aio()
+                except asyncio.CancelledError:
+                    # Nobody is waiting any more: stop the work. Keyed on the call,
+                    # so a late flag can never hit a reused job_id
+                    await cancel_flags.put.aio(call.object_id, time.time())
+                    raise
+            
+            async def render(publish, estimated_s: float, **kwargs) -> bytes:
+                # Wait for a GPU slot, then generate video
+                async with dispatcher.slot(job_id, priority=priority, estimated_s=estimated_s):
+                    await publish_metrics()
+                    started = time.time()
+                    call = await Wan2S2VModel().generate.spawn.aio(
+                        image_bytes=image_bytes,
+                        prompt=prompt,
+                        resolution=resolution,
+                        step_cache_threshold=step_cache_threshold,
+                        generation_fps=generation_fps,
+                        job_id=job_id,
+                        spawned_at=time.time(),
+                        **kwargs,
+                    )
+                    if publish:
+                        await publish(call.object_id)
+                    result = await result_of(call)
+                    traffic.record_job(time.time() - started)
+                await publish_metrics()
+                return result
+            
+            async def run_incremental(publish):
+                # Hashing, cutting and splicing run on CPU; the GPU slot is
+                # held only while the missing clips render
+                clips = await plan_clips.remote.aio(
+                    image_bytes=image_bytes,
+                    audio_bytes=render_audio_bytes,
+                    prompt=prompt,
+                    resolution=resolution,
+                    pose_video_bytes=pose_video_bytes,
+                    step_cache_threshold=step_cache_threshold,
+                    generation_fps=generation_fps,
+                    base_seed=seed,
+                    prior_job_id=prior_job_id,
+                    pose_video_hash=pose_video_hash,
+                )
+                first, hashes = clips["first"], clips["hashes"]
+                video_bytes = None
+                if first is not None:
+                    video_bytes = await render(
+                        None,
+                        estimate_duration_s(
+                            resolution=resolution,
+                            num_clips=len(hashes) - first,
+                            has_pose=pose_video_bytes is not None,
+                        ),
+                        audio_bytes=clips["audio"],
+                        num_clips=len(hashes) - first,
+                        pose_video_bytes=clips["pose_video"],
+                        base_seed=clips["seed"],
+                    )
+                call = await splice_clips.spawn.aio(
+                    render_audio_bytes,
+                    hashes,
+                    clips["windows"],
+                    first=first,
+                    video_bytes=video_bytes,
+                    job_id=job_id,
+                    resolution=resolution,
+                )
+                await publish(call.object_id)
+                return await result_of(call)
+            
+            async def run_generation(publish):
+                leader_jobs[key] = job_id
+                try:
+                    if incremental:
+                        return await run_incremental(publish)
+                    return await render(
+                        publish,
+                        estimated_s,
+                        audio_bytes=render_audio_bytes,
+                        num_clips=render_clips,
+                        pose_video_bytes=pose_video_bytes,
+                    )
+                finally:
+                    leader_jobs.pop(key, None)
+            
+            # Identical requests already in flight share one GPU render
+            key = request_key(
+                files={"image": image_bytes, "audio": audio_bytes, "pose_video": pose_video_bytes},
+                params={
+                    "prompt": prompt,
+                    "resolution": resolution,
+                    "num_clips": num_clips,
+                    "step_cache_threshold": step_cache_threshold,
+                    "generation_fps": generation_fps,
+                    "skip_silence": skip_silence,
+                    "incremental": incremental,
+                    "seed": seed if incremental else None,
+                },
+            )
+            if active["cancelled"]:
+                raise HTTPException(status_code=409, detail=f"Job '{job_id}' was cancelled")
+            task = asyncio.create_task(inflight.run(key, run_generation))
+            active.update(task=task, key=key)
+            watcher = asyncio.create_task(cancel_on_disconnect(request, task))
+            try:
+                video_bytes, coalesced = await task
+            except asyncio.CancelledError:
+                if not task.cancelled():
+                    raise
+                raise HTTPException(status_code=409, detail=f"Job '{job_id}' was cancelled")
+            finally:
+                watcher.cancel()
+                if not task.done():
+                    task.cancel()
+            if coalesced:
+                print(f"Request {job_id} attached to in-flight generation {key[:12]}")
+            
+            # Fill in frames on CPU after the GPU slot is released
+            if generation_fps:
+                video_bytes = await upsample_video.remote.aio(
+                    video_bytes, render_audio_bytes, target_fps=OUTPUT_FPS, method=interpolation
+                )
+            
+            # Put the skipped silences back and restore the original audio
+            if segment_plan:
+                video_bytes = await restore_silence.remote.aio(video_bytes, audio_bytes, segment_plan)
+            
             # Encode as base64 for JSON response
             video_base64 = base64.b64encode(video_bytes).decode('utf-8')
             
             return {
                 "success": True,
+                "job_id": job_id,
                 "video": video_base64,
                 "format": "mp4",
                 "resolution": resolution,
+                "coalesced": coalesced,
+                "silence_skipped_s": analysis["skipped_s"] if segment_plan else 0.0,
             }
+        except HTTPException:
+            raise
+        except JobCancelled as e:
+            raise HTTPException(status_code=409, detail=str(e))
         except NotImplementedError as e:
             raise HTTPException(
                 status_code=501,
                 detail="Video generation not yet implemented. Coming soon!"
             )
+        except InsufficientGPUMemory as e:
+            raise HTTPException(
+                status_code=413,
+                detail=f"{e}. Try 480p, fewer clips or a shorter audio track.",
+            )
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            active_requests.pop(job_id, None)
     
     return web_app
 
 
+# Frame interpolation runs on cheap CPU containers, not the A100
+@app.function(image=cpu_image, cpu=8.0, memory=8192, timeout=1800)
+def upsample_video(
+    video_bytes: bytes,
+    audio_bytes: bytes = None,
+    target_fps: int = OUTPUT_FPS,
+    method: str = "flow",
+) -> bytes:
+    """
+    Interpolate a low-frame-rate render to target_fps and mux the audio
+    
+    Args:
+        video_bytes: MP4 produced by generate(generation_fps=...)
+        audio_bytes: Original driving audio
+        target_fps: Output frame rate (24 for the API)
+        method: "flow" (optical flow) or "blend" (cross-fade)
+    
+    Returns:
+        Video as bytes (MP4 format, target_fps)
+    """
+    from interpolation import interpolate_video
+    
+    return interpolate_video(video_bytes, audio_bytes, dst_fps=target_fps, method=method)
+
+
+@app.function(image=cpu_image, cpu=2.0, memory=2048, timeout=300)
+def plan_silence(
+    audio_bytes: bytes,
+    min_saving: float = 0.15,
+    pose_video_bytes: bytes = None,
+    clip_s: float = CLIP_SECONDS,
+) -> dict:
+    """
+    Find speech and silence in the driving audio and compact it
+    
+    Args:
+        audio_bytes: Original audio (WAV/MP3)
+        min_saving: Skip compaction unless it removes at least this share
+        pose_video_bytes: Optional pose video on the original timeline; it is
+            compacted to the same windows so the render stays in sync
+        clip_s: Audio per generated clip, clip_seconds(generation_fps)
+    
+    Returns:
+        {"plan": SegmentPlan dict, "num_clips": clips for the compacted audio,
+         "skipped_s": seconds not rendered, "audio": compacted WAV bytes or None
+         when compaction is not worthwhile, "pose_video": compacted pose video
+         or None}
+    """
+    from audio_segments import analyze, compact_audio, compact_video
+    
+    plan = analyze(audio_bytes, clip_s=clip_s)
+    print(f"Audio segments: {plan.summary()}")
+    worthwhile = plan.worthwhile(min_saving)
+    return {
+        "plan": plan.as_dict(),
+        "num_clips": plan.num_clips,
+        "skipped_s": round(plan.skipped_s, 1),
+        "audio": compact_audio(audio_bytes, plan) if worthwhile else None,
+        "pose_video": (
+            compact_video(pose_video_bytes, plan) if worthwhile and pose_video_bytes else None
+        ),
+    }
+
+
+@app.function(image=cpu_image, cpu=4.0, memory=8192, timeout=1800)
+def restore_silence(video_bytes: bytes, audio_bytes: bytes, plan: dict) -> bytes:
+    """
+    Expand a render of compacted audio back to the original timeline
+    
+    Args:
+        video_bytes: MP4 rendered from plan_silence()'s compacted audio
+        audio_bytes: Original audio, muxed into the output
+        plan: The "plan" returned by plan_silence()
+    
+    Returns:
+        Video as bytes (MP4 format) covering the full audio
+    """
+    from audio_segments import SegmentPlan, expand_video
+    
+    return expand_video(video_bytes, audio_bytes, SegmentPlan.from_dict(plan))
+
+
+# Incremental re-renders: clip hashing, cutting and splicing run on CPU, so the
+# GPU (and the web dispatcher's slot) is only held while missing clips render
+@app.function(image=cpu_image, cpu=4.0, memory=8192, timeout=600, volumes={MODEL_CACHE_DIR: volume})
+def plan_clips(
+    image_bytes: bytes,
+    audio_bytes: bytes,
+    prompt: str = "",
+    resolution: str = "720p",
+    pose_video_bytes: bytes = None,
+    step_cache_threshold: float = None,
+    generation_fps: int = None,
+    base_seed: int = 42,
+    prior_job_id: str = None,
+    pose_video_hash: str = None,
+) -> dict:
+    """
+    Find the clips an incremental render still has to generate
+    
+    Clips are keyed by chained hashes of their audio window, the image,
+    prompt and settings, and the previous clip (see clip_cache.py). Windows
+    are clip_seconds(generation_fps) long, the audio one model clip covers.
+    Rendering starts at the first clip missing from the clip cache and runs
+    to the end; it starts from the reference image rather than the previous
+    clip's last frames.
+    
+    Args:
+        (as Wan2S2VModel.generate)
+        base_seed: Seed that per-clip render seeds are derived from; keep
+            it fixed between submissions so unchanged clips match
+        prior_job_id: Earlier job to report the clip diff against
+        pose_video_hash: sha256 of the pose video as uploaded. The prepared
+            pose video depends on the render length, so hashing it would
+            change every clip's hash when the audio gets longer
+    
+    Returns:
+        {"hashes", "windows", "first": first clip to render or None when all
+         are cached, "seed": render seed, "audio" / "pose_video": inputs from
+         the first missing clip on (None when nothing renders)}
+    """
+    import hashlib
+    from clip_cache import (
+        ClipStore, audio_windows, chain_hashes, clip_seed, clip_windows,
+        diff, first_missing, trim_audio, trim_video,
+    )
+    
+    clip_s = clip_seconds(generation_fps)
+    window_data, duration_s = audio_windows(audio_bytes, clip_s)
+    windows = clip_windows(duration_s, clip_s)
+    settings = {
+        "resolution": resolution,
+        "base_seed": base_seed,
+        "pose_video": (
+            pose_video_hash or hashlib.sha256(pose_video_bytes).hexdigest() if pose_video_bytes else None
+        ),
+        "step_cache_threshold": step_cache_threshold,
+        "generation_fps": generation_fps,
+    }
+    hashes = chain_hashes(window_data, image_bytes, prompt, settings)
+    
+    store = ClipStore(MODEL_CACHE_DIR)
+    volume.reload()
+    if prior_job_id:
+        prior = store.load_job(prior_job_id)
+        if prior:
+            changed = diff(hashes, prior["hashes"])
+            print(f"Clip diff vs {prior_job_id}: {len(changed)}/{len(hashes)} changed {changed}")
+        else:
+            print(f"⚠️  Prior job {prior_job_id} not found in clip cache")
+    
+    plan = {"hashes": hashes, "windows": [list(w) for w in windows], "first": None,
+            "seed": None, "audio": None, "pose_video": None}
+    first = first_missing(hashes, store.available(hashes))
+    if first is None:
+        print(f"✅ All {len(hashes)} clips cached, splicing without GPU work")
+        return plan
+    
+    start_s = windows[first][0]
+    print(f"Rendering clips {first}-{len(hashes) - 1} of {len(hashes)} (from {start_s:.1f}s)")
+    plan.update(
+        first=first,
+        seed=clip_seed(base_seed, first),
+        audio=trim_audio(audio_bytes, start_s) if first else audio_bytes,
+        pose_video=(
+            trim_video(pose_video_bytes, start_s) if pose_video_bytes and first else pose_video_bytes
+        ),
+    )
+    return plan
+
+
+@app.function(image=cpu_image, cpu=4.0, memory=8192, timeout=1800, volumes={MODEL_CACHE_DIR: volume})
+def splice_clips(
+    audio_bytes: bytes,
+    hashes: list,
+    windows: list,
+    first: int = None,
+    video_bytes: bytes = None,
+    job_id: str = None,
+    resolution: str = "720p",
+) -> bytes:
+    """
+    Store a render's new clips and splice the full video from the clip cache
+    
+    Args:
+        audio_bytes: Full audio, muxed into the output
+        hashes: Clip hashes from plan_clips
+        windows: Clip windows from plan_clips
+        first: First rendered clip, None when every clip was cached
+        video_bytes: Render of clips first..end
+        job_id: Records the job's hash list for later diffs
+        resolution: Stored with the job record
+    
+    The job's clips are marked as used and the clip cache is trimmed to
+    clip_cache.MAX_CACHE_BYTES / MAX_CLIP_AGE_S before the Volume commit.
+    
+    Returns:
+        Video as bytes (MP4 format)
+    """
+    import tempfile
+    from clip_cache import ClipStore
+    
+    store = ClipStore(MODEL_CACHE_DIR)
+    windows = [tuple(w) for w in windows]
+    try:
+        volume.reload()
+        if video_bytes is not None:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                render_path = Path(tmpdir) / "render.mp4"
+                render_path.write_bytes(video_bytes)
+                store.store_render(render_path, hashes, windows, first, is_cancelled=call_cancelled)
+        if job_id:
+            store.save_job(job_id, hashes, rendered_from=first, resolution=resolution)
+        store.evict(keep=hashes)
+        volume.commit()
+        return store.splice(hashes, audio_bytes, is_cancelled=call_cancelled)
+    finally:
+        clear_cancel_flag()
+
+
+# Pose videos are normalized once on CPU and cached on the Volume
+@app.function(image=cpu_image, cpu=4.0, memory=4096, timeout=600, volumes={MODEL_CACHE_DIR: volume})
+def prepare_pose(
+    pose_video_bytes: bytes,
+    resolution: str = "720p",
+    fps: int = MODEL_FPS,
+    duration_s: float = None,
+    clip_s: float = CLIP_SECONDS,
+    image_bytes: bytes = None,
+    audio_bytes: bytes = None,
+) -> bytes:
+    """
+    Resample and resize a pose video for generate(), with caching
+    
+    Args:
+        pose_video_bytes: Raw pose video (MP4)
+        resolution: "480p" or "720p"; with the reference image, sets the
+            output dims frames are scaled and cropped to
+        fps: Frame rate the render samples at (generation_fps or MODEL_FPS)
+        duration_s: Length of the render; only this much is decoded. None
+            to use the length of audio_bytes (one clip without audio)
+        clip_s: Audio per generated clip, used to bucket cached durations
+        image_bytes: Reference image; its aspect ratio decides the output
+            dims. Without it (or if it cannot be read) frames keep their size
+        audio_bytes: Audio the render follows, decoded for its exact length
+            when duration_s is None (header-based estimates are far off for
+            compressed audio below ~128 kbps)
+    
+    Returns:
+        Normalized pose video as bytes (MP4 format)
+    """
+    from pose_cache import PoseCache
+    
+    if duration_s is None:
+        if audio_bytes:
+            import librosa
+            
+            samples, sr = librosa.load(io.BytesIO(audio_bytes), sr=None, mono=True)
+            duration_s = len(samples) / float(sr)
+        else:
+            duration_s = clip_s
+    
+    size = SIZE_MAP.get(resolution, SIZE_MAP["720p"])
+    image_dims = compile_cache.image_size(image_bytes) if image_bytes else None
+    dims = compile_cache.output_dims(*image_dims, size) if image_dims else None
+    shape = f"{dims[0]}x{dims[1]}" if dims else "source size"
+    volume.reload()
+    pose_bytes, hit = PoseCache(MODEL_CACHE_DIR).normalize(
+        pose_video_bytes, fps, duration_s, clip_s=clip_s, dims=dims
+    )
+    if hit:
+        print(f"✅ Pose cache hit ({shape}, {fps} fps)")
+    else:
+        volume.commit()
+        print(f"✅ Pose video normalized and cached ({shape}, {fps} fps, {len(pose_bytes) / 1024:.0f} KB)")
+    return pose_bytes
+
+
+# Predictive warm pool: adjusts GPU autoscaler settings every minute
+@app.function(image=web_image, schedule=modal.Period(minutes=1))
+def warm_pool_controller():
+    """
+    Set min/buffer warm containers for Wan2S2VModel from recent traffic
+    
+    Reads arrivals and queue depth published by the web endpoint and
+    cold-start durations reported by GPU containers, then applies the
+    WarmPoolController decision via update_autoscaler.
+    """
+    from autoscaler import MetricsWindow, WarmPoolController, WarmPoolPolicy
+    
+    web = metrics.get("web", {})
+    traffic = MetricsWindow.from_dict(web)
+    
+    # This function is the only writer of "cold_starts"
+    cold_starts = metrics.get("cold_starts", [])
+    cold_starts = (cold_starts + cold_start_events.get_many(100, block=False))[-20:]
+    metrics["cold_starts"] = cold_starts
+    traffic.cold_starts.extend(cold_starts)
+    observation = traffic.observation(
+        queue_depth=web.get("queue_depth", 0),
+        running=web.get("running", 0),
+    )
+    
+    controller = WarmPoolController(
+        WarmPoolPolicy(
+            max_min_containers=GPU_MAX_CONTAINERS,
+            peak_windows=PEAK_WINDOWS,
+        )
+    )
+    controller.load_state(metrics.get("warm_pool_state", {}))
+    decision = controller.decide(observation)
+    metrics["warm_pool_state"] = controller.state()
+    
+    Wan2S2VModel().update_autoscaler(
+        min_containers=decision.min_containers,
+        buffer_containers=decision.buffer_containers,
+    )
+    print(
+        f"Warm pool: min={decision.min_containers} "
+        f"buffer={decision.buffer_containers} ({decision.reason})"
+    )
+    return decision.as_dict()
+
+
 # CLI function for testing
 @app.local_entrypoint()
 def main(
@@ -450,3 +1560,124 @@ def main(
         f.write(video_bytes)
     
     print(f"Video saved to {output_path}")
+
+
+@app.local_entrypoint()
+def warmup(resolutions: str = "480p,720p", aspects: str = ",".join(compile_cache.WARMUP_ASPECTS)):
+    """
+    Precompile and persist torch.compile caches (requires WAN2_COMPILE=1)
+    
+    Each resolution is warmed for every reference-image aspect ratio served,
+    since the output shape (and so the compiled kernels) follows the image.
+    
+    Usage:
+        WAN2_COMPILE=1 modal run wan2_modal.py::warmup --resolutions 480p,720p --aspects 4:3,9:16
+    """
+    model = Wan2S2VModel()
+    caches = model.warmup_compile.remote(
+        resolutions=[r.strip() for r in resolutions.split(",") if r.strip()],
+        aspects=[a.strip() for a in aspects.split(",") if a.strip()],
+    )
+    for key, manifest in caches.items():
+        print(f"{key}: {manifest['files']} files, {manifest['bytes'] / (1024 * 1024):.1f} MB")
+
+
+@app.local_entrypoint()
+def batch(
+    manifest: str,
+    max_concurrency: int = BATCH_MAX_SLOTS,
+    report_path: str = "",
+    overwrite: bool = False,
+):
+    """
+    Render every job in a JSONL/CSV manifest
+    
+    Jobs are spawned with bounded concurrency, each video is written as soon
+    as it finishes, and jobs whose output already exists are skipped, so an
+    interrupted run can simply be restarted.
+    
+    The run reserves `max_concurrency` GPU slots (at most BATCH_MAX_SLOTS)
+    in the shared metrics Dict; the web dispatcher stops using them until
+    the run ends, so interactive requests never queue behind batch calls
+    inside Modal.
+    
+    Usage:
+        modal run wan2_modal.py::batch \
+            --manifest jobs.jsonl \
+            --max-concurrency 3 \
+            --report-path report.json
+    """
+    import time
+    from batch import load_manifest, run_batch
+    
+    jobs = load_manifest(manifest)
+    report_path = report_path or f"{Path(manifest).with_suffix('')}.report.json"
+    print(f"Loaded {len(jobs)} jobs from {manifest}")
+    if max_concurrency > BATCH_MAX_SLOTS:
+        print(f"⚠️  Limiting --max-concurrency to {BATCH_MAX_SLOTS} so the web endpoint keeps a GPU")
+        max_concurrency = BATCH_MAX_SLOTS
+    
+    model = Wan2S2VModel()
+    reservation = {"renewed_at": 0.0}
+    
+    def reserve():
+        # Renewed while the run is alive; expires on its own if it is killed
+        now = time.time()
+        if now - reservation["renewed_at"] > BATCH_RESERVATION_TTL_S / 4:
+            metrics[BATCH_RESERVATION_KEY] = {
+                "slots": max_concurrency,
+                "expires_at": now + BATCH_RESERVATION_TTL_S,
+            }
+            reservation["renewed_at"] = now
+    
+    def start_generation(kwargs: dict, pose_video_bytes: bytes = None):
+        return model.generate.spawn(**kwargs, pose_video_bytes=pose_video_bytes, spawned_at=time.time())
+    
+    def submit(job):
+        kwargs = job.generate_kwargs()
+        pose_video_bytes = kwargs.pop("pose_video_bytes")
+        if not pose_video_bytes:
+            return {"call": start_generation(kwargs)}
+        # Normalize the pose video on CPU without holding up other submissions
+        pose_call = prepare_pose.spawn(
+            pose_video_bytes,
+            resolution=job.resolution,
+            duration_s=job.num_clips * CLIP_SECONDS if job.num_clips else None,
+            image_bytes=kwargs["image_bytes"],
+            audio_bytes=kwargs["audio_bytes"],
+        )
+        return {"pose_call": pose_call, "kwargs": kwargs}
+    
+    def result_of(call):
+        try:
+            return call.get(timeout=5)
+        except (TimeoutError, modal.exception.TimeoutError):
+            return None
+    
+    def poll(handle):
+        reserve()
+        if "call" not in handle:
+            pose_video_bytes = result_of(handle["pose_call"])
+            if pose_video_bytes is None:
+                return None
+            handle["call"] = start_generation(handle.pop("kwargs"), pose_video_bytes)
+        return result_of(handle["call"])
+    
+    reserve()
+    time.sleep(15)  # Let the web dispatcher pick up the reservation
+    try:
+        report = run_batch(
+            jobs,
+            submit=submit,
+            poll=poll,
+            max_concurrency=max_concurrency,
+            report_path=report_path,
+            manifest=manifest,
+            overwrite=overwrite,
+        )
+    finally:
+        metrics.pop(BATCH_RESERVATION_KEY, None)
+    
+    print("=" * 70)
+    print(f"Batch finished: {report.counts()}")
+    print(f"Report: {report_path}")
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Launcher for the official Wan2.2 generate.py with opt-in runtime patches
+
+Runs in place of `python /root/Wan2.2/generate.py` and accepts the same
+arguments. Before handing over to generate.py it applies optional patches to
+the Wan2.2 pipeline, selected through environment variables:
+
+    WAN2_COMPILE=1                     torch.compile the S2V DiT (caches via TORCHINDUCTOR_CACHE_DIR)
+    WAN2_STEP_CACHE_THRESHOLD=<float>  Reuse DiT outputs between similar timesteps
+    WAN2_SAMPLE_FPS=<int>              Generate (and align audio) at a reduced frame rate
+
+Usage:
+    python wan2_runner.py --task s2v-14B --size 1024*704 ...
+"""
+
+import atexit
+import os
+import runpy
+import signal
+import sys
+
+from compile_cache import compile_enabled
+
+WAN2_ROOT = os.environ.get("WAN2_ROOT", "/root/Wan2.2")
+GENERATE_SCRIPT = os.path.join(WAN2_ROOT, "generate.py")
+
+
+def patch_s2v_init(hook):
+    """
+    Call hook(pipeline) after every WanS2V pipeline is constructed
+
+    Returns False if this Wan2.2 checkout has no WanS2V pipeline.
+    """
+    try:
+        from wan.speech2video import WanS2V
+    except ImportError as e:
+        print(f"⚠️  WanS2V not found, skipping patch: {e}")
+        return False
+
+    original_init = WanS2V.__init__
+
+    def __init__(self, *args, **kwargs):
+        original_init(self, *args, **kwargs)
+        hook(self)
+
+    WanS2V.__init__ = __init__
+    return True
+
+
+def apply_compile():
+    """Compile the S2V noise model in place once the pipeline is built"""
+    import torch
+
+    mode = os.environ.get("WAN2_COMPILE_MODE", "max-autotune-no-cudagraphs")
+
+    def hook(pipeline):
+        noise_model = getattr(pipeline, "noise_model", None)
+        if noise_model is None:
+            print("⚠️  Pipeline has no noise_model, skipping torch.compile")
+            return
+        # In-place compile keeps the module type, so offloading and
+        # attribute access in the pipeline keep working
+        noise_model.compile(mode=mode, dynamic=False)
+        print(f"✅ torch.compile enabled (mode={mode}, torch {torch.__version__})")
+        print(f"   Inductor cache: {os.environ.get('TORCHINDUCTOR_CACHE_DIR', 'default')}")
+
+    patch_s2v_init(hook)
+
+
+def apply_step_cache(threshold: float):
+    """Route noise model calls through a StepCache and report skip rates"""
+    from step_cache import CachedModule, StepCache
+
+    cache = StepCache(
+        threshold=threshold,
+        warmup_steps=int(os.environ.get("WAN2_STEP_CACHE_WARMUP", "2")),
+        max_consecutive_skips=int(os.environ.get("WAN2_STEP_CACHE_MAX_SKIPS", "3")),
+    )
+
+    def hook(pipeline):
+        noise_model = getattr(pipeline, "noise_model", None)
+        if noise_model is None:
+            print("⚠️  Pipeline has no noise_model, skipping step cache")
+            return
+        pipeline.noise_model = CachedModule(noise_model, cache)
+        print(f"✅ Step cache enabled (threshold={threshold})")
+
+    if patch_s2v_init(hook):
+        atexit.register(lambda: print(cache.report(), flush=True))
+
+
+def apply_sample_fps(fps: int):
+    """Render S2V at `fps`; audio features are bucketed per frame at this rate"""
+    try:
+        from wan.configs import WAN_CONFIGS
+    except ImportError as e:
+        print(f"⚠️  Wan configs not found, keeping default fps: {e}")
+        return
+
+    for name, config in WAN_CONFIGS.items():
+        if name.startswith("s2v"):
+            config.sample_fps = fps
+
+    def hook(pipeline):
+        if hasattr(pipeline, "fps"):
+            pipeline.fps = fps
+        print(f"✅ Generating at {fps} fps")
+
+    patch_s2v_init(hook)
+
+
+def report_peak_memory():
+    """Print peak reserved VRAM for the memory planner"""
+    torch = sys.modules.get("torch")
+    if torch is None or not torch.cuda.is_available() or not torch.cuda.is_initialized():
+        return
+    from memory_planner import PEAK_PREFIX
+
+    print(f"{PEAK_PREFIX}{torch.cuda.max_memory_reserved() / 1e9:.2f}", flush=True)
+
+
+def exit_on_sigterm(signum, frame):
+    """Unwind normally on cancellation so CUDA memory is released on exit"""
+    print("⚠️  Generation cancelled, exiting", flush=True)
+    raise SystemExit(128 + signum)
+
+
+def main():
+    sys.path.insert(0, WAN2_ROOT)
+
+    if compile_enabled():
+        apply_compile()
+
+    sample_fps = int(os.environ.get("WAN2_SAMPLE_FPS", "0") or 0)
+    if sample_fps > 0:
+        apply_sample_fps(sample_fps)
+
+    step_cache_threshold = float(os.environ.get("WAN2_STEP_CACHE_THRESHOLD", "0") or 0)
+    if step_cache_threshold > 0:
+        apply_step_cache(step_cache_threshold)
+
+    atexit.register(report_peak_memory)
+    signal.signal(signal.SIGTERM, exit_on_sigterm)
+
+    sys.argv = [GENERATE_SCRIPT] + sys.argv[1:]
+    runpy.run_path(GENERATE_SCRIPT, run_name="__main__")
+
+
+if __name__ == "__main__":
+    main()